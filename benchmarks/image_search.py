@@ -0,0 +1,69 @@
+"""Compares the exhaustive and the coarse-to-fine NumPy image search on synthetic 3840x2160 screens, for several
+numbers of coarse candidates. A pyramid run agrees when it finds the same match as the exhaustive search.
+
+    python benchmarks/image_search.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pyauto import matcher
+
+
+def desktop(height=2160, width=3840, strokes=3000, seed=0):
+    """A light, smoothly shaded background with flat widgets and dark text-like strokes."""
+    rng = np.random.RandomState(seed)
+    yy, xx = np.mgrid[0:height, 0:width]
+    pixels = np.empty((height, width, 3), np.uint8)
+    pixels[...] = (200 + 40 * np.sin(xx / 300.0) * np.cos(yy / 200.0))[..., None].astype(np.uint8)
+    for _ in range(300):
+        y, x = rng.randint(0, height - 60), rng.randint(0, width - 200)
+        pixels[y:y + rng.randint(10, 60), x:x + rng.randint(20, 200)] = rng.randint(150, 256, 3)
+    for _ in range(strokes):
+        y, x = rng.randint(0, height - 12), rng.randint(0, width - 8)
+        pixels[y:y + 12, x:x + rng.randint(1, 3)] = rng.randint(0, 90)
+    return pixels
+
+
+def timed(func, *args, **kwargs):
+    start = time.time()
+    res = func(*args, **kwargs)
+    return res, time.time() - start
+
+
+def main(repeat=5):
+    # A button with text, and a low-contrast panel on a background without text, which leaves the sample tests of
+    # the exhaustive search many candidates. With a tolerance of 60 the panel also matches plain background, first at
+    # (798, 0): any match is then as good as the others, and both searches may well disagree
+    pixels = desktop()
+    plain = desktop(strokes=0)
+    plain[1540:1580, 2560:2640] = (150, 170, 190)
+    cases = [('text', pixels, pixels[1000:1120, 2000:2200].copy(), 100),
+             ('low contrast', plain, plain[1500:1620, 2500:2700].copy(), 40),
+             ('ambiguous', plain, plain[1500:1620, 2500:2700].copy(), 60)]
+
+    for name, pixels, needle, tolerance in cases:
+        tpl = matcher.Template(needle)
+        exhaustive = 0.0
+        for _ in range(repeat):
+            # A fresh Haystack per run, as each search grabs a new frame
+            found, elapsed = timed(matcher.find, matcher.Haystack(pixels), tpl, tolerance)
+            exhaustive += elapsed
+        print('%-14s exhaustive %7.1f ms %-12s' % (name, exhaustive / repeat * 1000, found and found.top_left))
+
+        for candidates in (8, 32, 128):
+            pyramid = 0.0
+            for _ in range(repeat):
+                coarse, elapsed = timed(matcher.find_coarse, matcher.Haystack(pixels), tpl, tolerance,
+                                        candidates=candidates)
+                pyramid += elapsed
+            print('%-14s pyramid %3d %7.1f ms %-12s x%-5.1f %s' % (
+                '', candidates, pyramid / repeat * 1000, coarse and coarse.top_left, exhaustive / pyramid,
+                'agrees' if coarse == found else 'differs'))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Compares one call per input action against compiled InputSequences, on a recording backend whose calls cost a
+fixed time, standing for the ctypes round-trip into AutoItX and its per-call delays.
+
+    python benchmarks/input_sequence.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pyauto.inputseq import InputSequence, RecordingBackend
+
+
+class SlowBackend(RecordingBackend):
+
+    def __init__(self, latency):
+        super(SlowBackend, self).__init__()
+        self.latency = latency
+
+    def send(self, keys, flag=0):
+        time.sleep(self.latency)
+        super(SlowBackend, self).send(keys, flag)
+
+    def mouse_move(self, x, y, speed=10):
+        time.sleep(self.latency)
+        super(SlowBackend, self).mouse_move(x, y, speed)
+
+    def mouse_click(self, x=None, y=None, button='', clicks=1, speed=10):
+        time.sleep(self.latency)
+        super(SlowBackend, self).mouse_click(x, y, button, clicks, speed)
+
+
+def form(fields, clicks):
+    # A form fill: each field is clicked, or reached with TAB, and typed into
+    seq = InputSequence()
+    for i in range(fields):
+        if clicks:
+            seq.move(100, 50 + 30 * i).click()
+        seq.text(u'value #%d' % i)
+        if not clicks:
+            seq.key('TAB')
+    return seq.key('ENTER')
+
+
+def one_by_one(seq, backend):
+    # What a script calling autoit directly does
+    for action in seq.actions:
+        if action[0] == 'send':
+            backend.send(action[1])
+        else:
+            getattr(backend, action[0])(*action[1:])
+    return len(seq.actions)
+
+
+def timed(func, *args):
+    start = time.time()
+    res = func(*args)
+    return res, time.time() - start
+
+
+def main(fields=50, latency=0.001, repeat=200):
+    print('form               actions   calls  batched calls   one by one ms   batched ms   build us/action')
+    for clicks in (False, True):
+        seq = form(fields, clicks)
+        calls, direct = timed(one_by_one, seq, SlowBackend(latency))
+        batched_calls, batched = timed(seq.run, SlowBackend(latency))
+
+        start = time.time()
+        for _ in range(repeat):
+            form(fields, clicks).compile()
+        build_us = (time.time() - start) / repeat / len(seq) * 1e6
+
+        print('%-17s %8d %7d %14d %15.1f %12.1f %17.2f' % ('clicks' if clicks else 'tabs', len(seq), calls,
+                                                         batched_calls, direct * 1000, batched * 1000, build_us))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Benchmarks the pure-Python parts of process enumeration on synthetic snapshot data,
+and serial against parallel detail lookups on a backend with simulated latency.
+
+    python benchmarks/process_list.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pyauto import process
+from pyauto.proctable import ProcessTable
+
+
+def synthetic_threads(processes, threads, seed=0):
+    rng = random.Random(seed)
+    pids = [4 * (i + 1) for i in range(processes)]
+    return pids, [{'tid': 4 * (i + 1), 'pid': rng.choice(pids), 'base_priority': 8} for i in range(threads)]
+
+
+def timed(func, *args):
+    start = time.time()
+    func(*args)
+    return time.time() - start
+
+
+def scan(pids, thread_list):
+    return [[t for t in thread_list if t['pid'] == pid] for pid in pids]
+
+
+def index(pids, thread_list):
+    threads_by_pid = process.group_threads(thread_list)
+    return [threads_by_pid.get(pid, []) for pid in pids]
+
+
+def bench_thread_index():
+    print('threads by pid     processes  threads    scan ms   index ms')
+    for processes, threads in [(100, 2000), (400, 8000), (1600, 32000)]:
+        pids, thread_list = synthetic_threads(processes, threads)
+        print('%27d %8d %10.1f %10.1f' % (processes, threads, timed(scan, pids, thread_list) * 1000,
+                                          timed(index, pids, thread_list) * 1000))
+
+
+def synthetic_processes(processes, seed=0):
+    rng = random.Random(seed)
+    names = ['svchost.exe', 'chrome.exe', 'conhost.exe', 'explorer.exe', 'python.exe']
+    return [(rng.choice(names).encode('ascii'), 4 * (i + 1), 4, rng.randint(1, 60), 8) for i in range(processes)]
+
+
+def allocated(func):
+    # Bytes still allocated by the result of func, where tracemalloc is available
+    import tracemalloc
+    tracemalloc.start()
+    res = func()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del res
+    return size
+
+
+def bench_table(processes=400, repeat=100):
+    # Entries are decoded anew on every poll, so the names are fresh copies, as they would be from a snapshot
+    entries = synthetic_processes(processes)
+
+    def dicts():
+        return [{'name': bytes(bytearray(name)), 'pid': pid, 'ppid': ppid, 'thread_count': threads,
+                 'priority_base': priority} for name, pid, ppid, threads, priority in entries]
+
+    def table():
+        t = ProcessTable()
+        for name, pid, ppid, threads, priority in entries:
+            t.append(bytes(bytearray(name)), pid, ppid, threads, priority)
+        return t
+
+    print('process table      processes    dicts ms   table ms    dicts KB   table KB')
+    line = '%27d %11.2f %10.2f' % (processes, timed(lambda: [dicts() for _ in range(repeat)]) * 1000 / repeat,
+                                   timed(lambda: [table() for _ in range(repeat)]) * 1000 / repeat)
+    try:
+        line += ' %11.1f %10.1f' % (allocated(dicts) / 1024.0, allocated(table) / 1024.0)
+    except ImportError:
+        pass
+    print(line)
+
+
+class SlowBackend(process.Backend):
+    # Synthetic processes whose details take a fixed time to look up, like a module snapshot waiting on the kernel
+
+    def __init__(self, entries, latency):
+        self.entries = entries
+        self.latency = latency
+
+    def process_entries(self, errors=None):
+        return iter(self.entries)
+
+    def priority_class(self, pid, errors=None):
+        time.sleep(self.latency / 10)
+        return 0x20
+
+    def modules(self, pid, errors=None):
+        time.sleep(self.latency)
+        return []
+
+    def threads(self, pid=None, errors=None):
+        return []
+
+
+def bench_details(processes=200, latency=0.002):
+    process.set_backend(SlowBackend(synthetic_processes(processes), latency))
+    try:
+        print('details            processes   serial ms   2 workers ms   8 workers ms   32 workers ms')
+        print('%27d %11.1f %14.1f %14.1f %15.1f' % (
+            (processes, timed(process.get_process_list, process.DETAIL_FIELDS) * 1000) +
+            tuple(timed(process.get_process_list, process.DETAIL_FIELDS, workers) * 1000 for workers in (2, 8, 32))))
+    finally:
+        process.set_backend(None)
+
+
+if __name__ == '__main__':
+    bench_thread_index()
+    bench_table()
+    bench_details()
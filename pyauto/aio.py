@@ -0,0 +1,214 @@
+"""Awaitable waits for asyncio programs: windows, processes, images and pixel changes. Python 3 only.
+
+All the waits of an event loop share one Poller, which runs their checks in a single executor thread: hundreds of
+concurrent waits cost one thread, and the checks of a tick share one process snapshot and one window snapshot.
+A timeout of 0 waits indefinitely, as in the autoit module; cancelling the awaiting task drops its wait.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import time
+import weakref
+
+from . import capture, matcher, pixel, process
+
+
+class _Tick(object):
+    # What the checks of one tick share, looked up on first use
+
+    def __init__(self):
+        self._processes = None
+        self._windows = None
+
+    def processes(self):
+        """
+        :return: a process.ProcessIndex
+        """
+        if self._processes is None:
+            self._processes = process.get_process_index()
+        return self._processes
+
+    def windows(self):
+        """
+        :return: a window.WindowSnapshot
+        """
+        if self._windows is None:
+            from .window import WindowSnapshot
+            self._windows = WindowSnapshot()
+        return self._windows
+
+
+def _check_all(checks):
+    # Runs in the executor thread
+    tick = _Tick()
+    results = []
+    for check in checks:
+        try:
+            results.append((True, check(tick)))
+        except Exception as e:
+            results.append((False, e))
+    return results
+
+
+class _Waiter(object):
+    __slots__ = ('check', 'future', 'deadline', 'interval', 'due', 'default')
+
+    def __init__(self, check, future, deadline, interval, due, default):
+        self.check = check
+        self.future = future
+        self.deadline = deadline
+        self.interval = interval
+        self.due = due
+        self.default = default
+
+
+class Poller(object):
+    """Runs the checks of the waits of one event loop, each at its own interval and until its own deadline.
+    Checks due at the same time run together in one executor job.
+    """
+
+    def __init__(self):
+        # The executor, the wake-up event and the task exist while there are waits only: an idle poller holds nothing
+        # of its loop, so a closed loop is collected along with its poller, and leaves no thread behind
+        self._executor = None
+        self._wakeup = None
+        self._task = None
+        self._waiters = []
+        self.ticks = 0  # number of executor jobs run
+
+    def wait(self, check, timeout=0, interval=0.1, default=None):
+        """
+        :param check: function of a tick, run in the executor thread, returning a false value until the wait is over
+        :param timeout: seconds to wait at most, 0 to wait indefinitely
+        :param interval: seconds between checks
+        :param default: result of the wait if it times out
+        :return: a future of the first true result of check, or of default
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        now = time.monotonic()
+        if self._task is not None and self._task.done():
+            self._release(self._task)  # its callback is yet to run
+        self._waiters.append(_Waiter(check, future, now + timeout if timeout else None, interval, now, default))
+        if self._task is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._run())
+            self._task.add_done_callback(self._release)
+        else:
+            self._wakeup.set()
+        return future
+
+    def _release(self, task):
+        # Also runs when the loop shuts down and cancels the task, maybe before it even started
+        if task is not self._task:
+            return  # released already
+        for w in self._waiters:
+            w.future.cancel()
+        self._executor.shutdown(wait=False)
+        self._executor = self._wakeup = self._task = None
+        self._waiters = []
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            now = time.monotonic()
+            waiters = []
+            for w in self._waiters:
+                if w.future.done():
+                    continue  # cancelled
+                if w.deadline is not None and now >= w.deadline:
+                    w.future.set_result(w.default)
+                    continue
+                waiters.append(w)
+            self._waiters = waiters  # waits started while the checks run are appended to this list
+            if not waiters:
+                return
+
+            due = [w for w in waiters if w.due <= now]
+            if due:
+                results = await loop.run_in_executor(self._executor, _check_all, [w.check for w in due])
+                self.ticks += 1
+                now = time.monotonic()
+                for w, (ok, value) in zip(due, results):
+                    if w.future.done():
+                        continue
+                    if not ok:
+                        w.future.set_exception(value)
+                    elif value:
+                        w.future.set_result(value)
+                    else:
+                        w.due = now + w.interval
+                continue
+
+            wake = min([w.due for w in waiters] + [w.deadline for w in waiters if w.deadline is not None])
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(wake - now, 0))
+            except asyncio.TimeoutError:
+                pass
+
+
+_pollers = weakref.WeakKeyDictionary()  # event loop -> Poller
+
+
+def get_poller():
+    """
+    :return: the Poller of the running event loop
+    """
+    loop = asyncio.get_running_loop()
+    poller = _pollers.get(loop)
+    if poller is None:
+        poller = _pollers[loop] = Poller()
+    return poller
+
+
+async def wait_window(title, timeout=0, interval=0.1):
+    """Waits for a visible window whose title starts with title, like autoit.win_wait.
+
+    :return: the window handle, or None if the wait timed out
+    """
+    def check(tick):
+        found = tick.windows().title_starts_with(title, visible=True)
+        return found[0].hwnd if found else None
+    return await get_poller().wait(check, timeout, interval)
+
+
+async def wait_process(process_, timeout=0, interval=0.1):
+    """Waits for a process to exist, like autoit.process_wait.
+
+    :param process_: the name or PID of the process, e.g. "notepad.exe" or 3647
+    :return: the PID of the process, the highest one if several have that name, or 0 if the wait timed out
+    """
+    return await get_poller().wait(lambda tick: tick.processes().exists(process_), timeout, interval, 0)
+
+
+async def wait_process_close(process_, timeout=0, interval=0.1):
+    """Waits for a process not to exist, like autoit.process_wait_close.
+
+    :param process_: the name or PID of the process
+    :return: True if the process closed, False if the wait timed out
+    """
+    return await get_poller().wait(lambda tick: process_ not in tick.processes(), timeout, interval, False)
+
+
+async def wait_image(image_file, x, y, width, height, tolerance=100, timeout=0, interval=0.1):
+    """Waits for an image to show in a screen area, searching it with pyauto.matcher.
+
+    :param image_file: path of the image, a pixel array or a matcher.Template
+    :param tolerance: 0~255; 0 for no tolerance
+    :return: a matcher.Match in screen coordinates, or None if the wait timed out
+    """
+    def check(tick):
+        res = matcher.find(capture.grab(x, y, width, height).pixels, image_file, tolerance)
+        return None if res is None else res.translate(x, y)
+    return await get_poller().wait(check, timeout, interval)
+
+
+async def wait_pixel_change(left, top, right, bottom, timeout=0, interval=0.05, tile=32):
+    """Waits for something to change in a rectangle of pixels, like pixel.wait_for_change.
+    The rectangle is first grabbed on the first check.
+
+    :return: list of tuples of x, y, width, height of the changed tiles, empty if the wait timed out
+    """
+    detector = pixel.ChangeDetector(left, top, right, bottom, tile)
+    return await get_poller().wait(lambda tick: detector.update(), timeout, interval, [])
@@ -0,0 +1,263 @@
+"""Screen capture behind a pluggable backend.
+
+A grab returns a Frame whose ``pixels`` is a BGRA NumPy view of the backend's buffer, not a copy. Image search,
+pixel probes and change detection can thus work off one grab per tick: grab the screen once, then crop the frame,
+or let ``grab`` serve areas from a recent enough frame with ``max_age``.
+"""
+from ctypes import *
+import os
+import time
+
+import numpy as np
+
+from .cache import LRUCache
+
+
+class Frame(object):
+    """Pixels of a screen area, with the screen coordinates of their top left corner."""
+
+    def __init__(self, pixels, x=0, y=0, timestamp=None, owner=None):
+        """
+        :param pixels: BGRA uint8 array of shape (height, width, 4)
+        :param x: screen X coordinate of the top left pixel
+        :param y: screen Y coordinate of the top left pixel
+        :param timestamp: time.time() of the grab
+        :param owner: object keeping the memory of pixels alive
+        """
+        self.pixels = pixels
+        self.x = x
+        self.y = y
+        self.height, self.width = pixels.shape[:2]
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self._owner = owner
+
+    def contains(self, x, y, width, height):
+        return (self.x <= x and self.y <= y and
+                x + width <= self.x + self.width and y + height <= self.y + self.height)
+
+    def crop(self, x, y, width, height):
+        """
+        :return: a Frame of the given screen area viewing the same memory
+        :raise ValueError: if the area is not within this frame
+        """
+        if not self.contains(x, y, width, height):
+            raise ValueError('area %r is out of the frame %r' % ((x, y, width, height),
+                                                                 (self.x, self.y, self.width, self.height)))
+        left, top = x - self.x, y - self.y
+        return Frame(self.pixels[top:top + height, left:left + width], x, y, self.timestamp, self._owner)
+
+    def copy(self):
+        """
+        :return: a Frame owning a copy of the pixels, which outlives later grabs into the same buffer
+        """
+        return Frame(self.pixels.copy(), self.x, self.y, self.timestamp)
+
+
+class Backend(object):
+    """Grabs screen areas into Frames."""
+
+    def screen_rect(self):
+        """
+        :return: tuple of x, y, width, height of the whole (virtual) screen
+        """
+        raise NotImplementedError
+
+    def grab(self, x, y, width, height):
+        """
+        :return: a Frame of the area
+        """
+        raise NotImplementedError
+
+
+class ArrayBackend(Backend):
+    """A fake screen held in an array, for running and testing capture users off Windows."""
+
+    def __init__(self, pixels):
+        """
+        :param pixels: BGR or BGRA uint8 array of shape (height, width, channels), the screen contents
+        """
+        self.pixels = None
+        self.set_pixels(pixels)
+
+    def set_pixels(self, pixels):
+        pixels = np.asarray(pixels, np.uint8)
+        if pixels.shape[2] == 3:
+            pixels = np.concatenate([pixels, np.full(pixels.shape[:2] + (1,), 255, np.uint8)], axis=2)
+        self.pixels = np.ascontiguousarray(pixels)
+
+    def screen_rect(self):
+        return 0, 0, self.pixels.shape[1], self.pixels.shape[0]
+
+    def grab(self, x, y, width, height):
+        return Frame(self.pixels[y:y + height, x:x + width], x, y)
+
+
+class FileBackend(ArrayBackend):
+    """A fake screen read from an image file."""
+
+    def __init__(self, image_file):
+        from .matcher import load_image
+        super(FileBackend, self).__init__(load_image(image_file))
+
+
+SRCCOPY = 0x00CC0020
+CAPTUREBLT = 0x40000000
+DIB_RGB_COLORS = 0
+BI_RGB = 0
+SM_XVIRTUALSCREEN = 76
+SM_YVIRTUALSCREEN = 77
+SM_CXVIRTUALSCREEN = 78
+SM_CYVIRTUALSCREEN = 79
+
+
+class BITMAPINFOHEADER(Structure):
+    _fields_ = [
+        ('biSize', c_ulong),
+        ('biWidth', c_long),
+        ('biHeight', c_long),  # negative for a top-down bitmap
+        ('biPlanes', c_ushort),
+        ('biBitCount', c_ushort),
+        ('biCompression', c_ulong),
+        ('biSizeImage', c_ulong),
+        ('biXPelsPerMeter', c_long),
+        ('biYPelsPerMeter', c_long),
+        ('biClrUsed', c_ulong),
+        ('biClrImportant', c_ulong)
+    ]
+
+
+class _DIBSection(object):
+    # A memory DC with a top-down 32-bit DIB section selected, whose pixel bits are directly addressable
+
+    def __init__(self, gdi32, width, height):
+        self._gdi32 = gdi32
+        self.bitmap = self._old = None
+        self.dc = gdi32.CreateCompatibleDC(None)
+        if not self.dc:
+            raise WinError()
+
+        bmi = BITMAPINFOHEADER()
+        bmi.biSize = sizeof(BITMAPINFOHEADER)
+        bmi.biWidth = width
+        bmi.biHeight = -height
+        bmi.biPlanes = 1
+        bmi.biBitCount = 32
+        bmi.biCompression = BI_RGB
+
+        bits = c_void_p()
+        self.bitmap = gdi32.CreateDIBSection(self.dc, pointer(bmi), DIB_RGB_COLORS, pointer(bits), None, 0)
+        if not self.bitmap or not bits.value:
+            raise WinError()  # e.g. out of GDI objects or of memory for a huge area
+        self._old = gdi32.SelectObject(self.dc, self.bitmap)
+        buf = (c_ubyte * (width * height * 4)).from_address(bits.value)
+        self.pixels = np.frombuffer(buf, np.uint8).reshape(height, width, 4)
+
+    def __del__(self):
+        # Also runs after a failed __init__, for whatever was created
+        if not getattr(self, 'dc', None):
+            return
+        if self._old:
+            self._gdi32.SelectObject(self.dc, self._old)
+        if self.bitmap:
+            self._gdi32.DeleteObject(self.bitmap)
+        self._gdi32.DeleteDC(self.dc)
+
+
+class GDIBackend(Backend):
+    """BitBlt from the screen DC into DIB sections, one per grab size, reused across grabs.
+    A Frame therefore shows the pixels of the latest grab of its size; Frame.copy() keeps them.
+    """
+
+    def __init__(self, max_sections=8):
+        """
+        :param max_sections: number of grab sizes whose DIB sections are kept
+        """
+        self._user32 = user32 = windll.user32
+        self._gdi32 = gdi32 = windll.gdi32
+
+        user32.GetDC.argtypes = [c_void_p]
+        user32.GetDC.restype = c_void_p
+        user32.ReleaseDC.argtypes = [c_void_p, c_void_p]
+        gdi32.CreateCompatibleDC.argtypes = [c_void_p]
+        gdi32.CreateCompatibleDC.restype = c_void_p
+        gdi32.CreateDIBSection.argtypes = [c_void_p, POINTER(BITMAPINFOHEADER), c_uint, POINTER(c_void_p),
+                                           c_void_p, c_ulong]
+        gdi32.CreateDIBSection.restype = c_void_p
+        gdi32.SelectObject.argtypes = [c_void_p, c_void_p]
+        gdi32.SelectObject.restype = c_void_p
+        gdi32.BitBlt.argtypes = [c_void_p, c_int, c_int, c_int, c_int, c_void_p, c_int, c_int, c_ulong]
+        gdi32.DeleteObject.argtypes = [c_void_p]
+        gdi32.DeleteDC.argtypes = [c_void_p]
+
+        # Frames hold a reference to their section, so an evicted one is freed once its last frame goes away
+        self._sections = LRUCache(max_sections)
+
+    def screen_rect(self):
+        metric = self._user32.GetSystemMetrics
+        return (metric(SM_XVIRTUALSCREEN), metric(SM_YVIRTUALSCREEN),
+                metric(SM_CXVIRTUALSCREEN), metric(SM_CYVIRTUALSCREEN))
+
+    def grab(self, x, y, width, height):
+        section = self._sections.get((width, height))
+        if section is None:
+            section = _DIBSection(self._gdi32, width, height)
+            self._sections.put((width, height), section)
+
+        screen = self._user32.GetDC(None)
+        self._gdi32.BitBlt(section.dc, 0, 0, width, height, screen, x, y, SRCCOPY | CAPTUREBLT)
+        self._user32.ReleaseDC(None, screen)
+        self._gdi32.GdiFlush()
+        return Frame(section.pixels, x, y, owner=section)
+
+
+_backend = None
+
+
+def get_backend():
+    """
+    :return: the Backend in use, a GDIBackend on Windows unless set_backend was called
+    """
+    global _backend
+    if _backend is None:
+        if os.name != 'nt':
+            raise RuntimeError('no screen capture backend on this platform, use capture.set_backend')
+        _backend = GDIBackend()
+    return _backend
+
+
+def set_backend(backend):
+    """
+    :param backend: a Backend, e.g. an ArrayBackend to run off screen; None to restore the default
+    """
+    global _backend, _last
+    _backend = backend
+    _last = None
+
+
+# Default max_age of grab, in seconds; raise it to share one grab among all capture users of a tick
+default_max_age = 0
+
+_last = None
+
+
+def grab(x=None, y=None, width=None, height=None, max_age=None):
+    """Grabs a screen area, the whole screen by default.
+
+    :param max_age: serve the area from the latest grab if it contains it and is at most this old, in seconds;
+    defaults to capture.default_max_age
+    :return: a Frame
+    """
+    global _last
+    backend = get_backend()
+    if x is None:
+        x, y, width, height = backend.screen_rect()
+    if max_age is None:
+        max_age = default_max_age
+
+    last = _last
+    if last is not None and max_age > 0 and time.time() - last.timestamp <= max_age and \
+            last.contains(x, y, width, height):
+        return last.crop(x, y, width, height)
+
+    _last = backend.grab(x, y, width, height)
+    return _last
@@ -2,37 +2,116 @@ from ctypes import *
 import platform
 import os
 
+from . import capture, matcher
+
 
 _arch = platform.architecture()[0]
 _isdll = 'ImageSearchDLL_x64.dll' if _arch == '64bit' else 'ImageSearchDLL.dll'
 _isdll = os.path.join(os.path.dirname(__file__), _isdll)
-_isdll = windll.LoadLibrary(_isdll)
+if os.name == 'nt':
+    _isdll = windll.LoadLibrary(_isdll)
+
+    _isdll.ImageSearch.argtypes = [c_int, c_int, c_int, c_int, c_char_p]
+    _isdll.ImageSearch.restype = c_char_p
+
+
+def _grab(x, y, width, height):
+    return capture.grab(x, y, width, height).pixels
+
 
+def _search(image_file, x, y, width, height, tolerance, engine, pyramid):
+    if engine == 'numpy':
+        haystack = _grab(x, y, width, height)
+        if pyramid:
+            res = matcher.find_coarse(haystack, image_file, tolerance, levels=pyramid)
+        else:
+            res = matcher.find(haystack, image_file, tolerance)
+        return None if res is None else res.translate(x, y)
 
-_isdll.ImageSearch.argtypes = [c_int, c_int, c_int, c_int, c_char_p]
-_isdll.ImageSearch.restype = c_char_p
+    if os.name != 'nt':
+        raise RuntimeError("ImageSearchDLL needs Windows, use engine='numpy'")
+    query = '*%s %s' % (tolerance, image_file)
+    if not isinstance(query, bytes):
+        query = query.encode('mbcs')  # the DLL takes an ANSI path
+    res = _isdll.ImageSearch(x, y, x + width, y + height, query)
+    return matcher.Match.parse(res, image_file)
 
 
-def search(image_file, x, y, width, height, tolerance=100, position='top_left'):
+locality = matcher.LocalityCache()
+
+
+def match(image_file, x, y, width, height, tolerance=100, engine='dll', pyramid=0, use_locality=False):
     """
-    :param image_file:
+    :param image_file: path of the image; the 'numpy' engine also takes a pixel array or a matcher.Template
+    :param x: X coordinate of top left corner of search area
+    :param y: Y coordinate of top left corner of search area
+    :param width: width of of search area
+    :param height: height of of search area
+    :param tolerance: 0~255; 0 for no tolerance
+    :param engine: 'dll' to search with ImageSearchDLL, 'numpy' to grab the area and search it with pyauto.matcher
+    :param pyramid: with the 'numpy' engine, number of halvings for a coarse-to-fine search (see matcher.find_coarse);
+    0 tests every offset at full resolution
+    :param use_locality: search around the last hit of image_file first, falling back to the whole area on a miss;
+    the hit and fallback counters are kept by image.locality; a pixel array must then be passed as a matcher.Template,
+    created once, so that it identifies the same needle from one call to the next
+    :return: a matcher.Match in screen coordinates, or None
+    """
+    if use_locality:
+        return locality.search(image_file, x, y, width, height,
+                               lambda *area: _search(image_file, *(area + (tolerance, engine, pyramid))))
+    return _search(image_file, x, y, width, height, tolerance, engine, pyramid)
+
+
+def search(image_file, x, y, width, height, tolerance=100, position='top_left', engine='dll', pyramid=0,
+           use_locality=False):
+    """
+    :param image_file: path of the image; the 'numpy' engine also takes a pixel array or a matcher.Template
     :param x: X coordinate of top left corner of search area
     :param y: Y coordinate of top left corner of search area
     :param width: width of of search area
     :param height: height of of search area
     :param tolerance: 0~255; 0 for no tolerance
     :param position: select position to return: 'top_left', 'top_right', 'bottom_left', 'bottom_right', 'center'
+    :param engine: 'dll' or 'numpy', see match()
+    :param pyramid: see match()
+    :param use_locality: see match()
     :return: tuple of x, y coordinates of selected position
     """
-    res = _isdll.ImageSearch(x, y, x + width, y + height, '*%s %s' % (tolerance, image_file))
-    res = res.split('|')
-    if res[0] == '1':
-        return {
-            'top_left': lambda x, y, w, h: (x, y),
-            'top_right': lambda x, y, w, h: (x + w, y),
-            'bottom_left': lambda x, y, w, h: (x, y + h),
-            'bottom_right': lambda x, y, w, h: (x + w, y + h),
-            'center': lambda x, y, w, h: (int(x + w / 2), int(y + h / 2))
-        }[position](int(res[1]), int(res[2]), int(res[3]), int(res[4]))
-    else:
+    res = match(image_file, x, y, width, height, tolerance, engine, pyramid, use_locality)
+    if res is None:
         return False, False
+    return res.anchor(position)
+
+
+def search_all(image_file, x, y, width, height, tolerance=100, threshold=0.0, overlap=0.3, max_results=None):
+    """Searches every occurrence of an image in one grab of the search area.
+
+    :param image_file: path of the image, a pixel array or a matcher.Template
+    :param x: X coordinate of top left corner of search area
+    :param y: Y coordinate of top left corner of search area
+    :param width: width of of search area
+    :param height: height of of search area
+    :param tolerance: 0~255; 0 for no tolerance
+    :param threshold: minimal score of a match, 0~1 (1 for an exact match)
+    :param overlap: 0~1; of the matches overlapping more than this, only the best one is kept
+    :param max_results: maximal number of matches to return, None for no limit
+    :return: list of matcher.Matches in screen coordinates, best score first
+    """
+    found = matcher.find_all(_grab(x, y, width, height), image_file, tolerance, threshold, overlap, max_results)
+    return [res.translate(x, y) for res in found]
+
+
+def search_many(image_files, x, y, width, height, tolerance=100):
+    """Searches several images in one grab of the search area, e.g. to tell which of many UI states is shown.
+
+    :param image_files: list of image paths or matcher.Templates
+    :param x: X coordinate of top left corner of search area
+    :param y: Y coordinate of top left corner of search area
+    :param width: width of of search area
+    :param height: height of of search area
+    :param tolerance: 0~255; 0 for no tolerance
+    :return: dict mapping each of image_files to a matcher.Match in screen coordinates, or to None if not found
+    """
+    found = matcher.find_many(_grab(x, y, width, height), image_files, tolerance)
+    return dict((image_file, res if res is None else res.translate(x, y))
+                for image_file, res in zip(image_files, found))
@@ -0,0 +1,162 @@
+"""Batched keyboard and mouse input.
+
+An InputSequence collects keys, text, clicks and moves, folds them into as few calls as possible, and runs them
+through one backend: an object with the ``send``, ``mouse_move``, ``mouse_click``, ``mouse_wheel`` and ``set_option``
+functions of the autoit module, which is the default.
+"""
+from .keys import validate
+
+_ESCAPES = dict((c, u'{%s}' % c) for c in u'!#+^{}')
+_MODIFIERS = u'!#+^'
+
+
+def escape(text):
+    """
+    :param text: raw text
+    :return: text in the Send syntax (see autoit.send), sending the characters as written
+    """
+    return u''.join(_ESCAPES.get(c, c) for c in text)
+
+
+class RecordingBackend(object):
+    """A fake backend recording the calls it receives, for running and testing sequences off Windows."""
+
+    def __init__(self):
+        self.calls = []  # tuples of function name and arguments
+        self.options = {}
+
+    def send(self, keys, flag=0):
+        self.calls.append(('send', keys, flag))
+
+    def mouse_move(self, x, y, speed=10):
+        self.calls.append(('mouse_move', x, y, speed))
+
+    def mouse_click(self, x=None, y=None, button='', clicks=1, speed=10):
+        self.calls.append(('mouse_click', x, y, button, clicks, speed))
+
+    def mouse_wheel(self, direction, clicks=1):
+        self.calls.append(('mouse_wheel', direction, clicks))
+
+    def set_option(self, option, value):
+        self.calls.append(('set_option', option, value))
+        previous, self.options[option] = self.options.get(option, 0), value
+        return previous
+
+
+class InputSequence(object):
+    """Keys, text, clicks and moves to run in one go, e.g. to fill in a form:
+
+        InputSequence().click(200, 120).text(u'John').key('TAB').text(u'Smith').key('ENTER').run()
+
+    compiles to a mouse_click and a single send of u'John{TAB}Smith{ENTER}'.
+    """
+
+    def __init__(self, options=None):
+        """
+        :param options: dict of AutoIt options to set for the run, e.g. {'SendKeyDelay': 0}; the previous values are
+        restored afterwards
+        """
+        self.options = dict(options or {})
+        self.actions = []  # tuples of the backend function name and its arguments
+        self._compiled = None
+
+    def _append(self, *action):
+        self.actions.append(action)
+        self._compiled = None
+        return self
+
+    def send(self, keys):
+        """
+        :param keys: keys in the Send syntax, see autoit.send
+        :return: the sequence, for chaining
+        :raise keys.SendSyntaxError: if keys is malformed, so that a sequence fails when it is built, not halfway
+        through its run
+        """
+        return self._append('send', validate(keys)) if keys else self
+
+    def text(self, text):
+        """
+        :param text: raw text, sent as written
+        """
+        return self.send(escape(text))
+
+    def key(self, key, count=1):
+        """
+        :param key: name of a key of the Send syntax, e.g. 'TAB' or 'F5'
+        :param count: number of times to press it
+        """
+        return self.send(u'{%s}' % key if count == 1 else u'{%s %d}' % (key, count))
+
+    def move(self, x, y, speed=0):
+        """
+        :param speed: 1 (fastest) to 100 (slowest), 0 to move instantly
+        """
+        return self._append('mouse_move', x, y, speed)
+
+    def click(self, x=None, y=None, button='', clicks=1, speed=0):
+        """
+        :param x: X coordinate to click at, None for where the mouse is
+        :param y: Y coordinate to click at, None for where the mouse is
+        :param button: see autoit.mouse_click
+        """
+        return self._append('mouse_click', x, y, button, clicks, speed)
+
+    def wheel(self, direction, clicks=1):
+        """
+        :param direction: "up" or "down"
+        """
+        return self._append('mouse_wheel', direction, clicks)
+
+    def compile(self):
+        """Folds the actions into as few backend calls as possible:
+        consecutive sends are joined into one Send string, unless the first ends with a modifier that would apply to
+        the next; a move followed by another move or by a click is dropped, as only where the mouse ends up matters,
+        and a click without coordinates takes those of the move; repeated clicks in place and wheel turns in the same
+        direction are added up.
+
+        :return: list of tuples of the backend function name and its arguments
+        """
+        if self._compiled is not None:
+            return self._compiled
+
+        calls = []
+        for action in self.actions:
+            name, last = action[0], calls[-1] if calls else (None,)
+            if name == 'send' and last[0] == 'send' and last[1][-1] not in _MODIFIERS:
+                calls[-1] = ('send', last[1] + action[1])
+            elif name == 'mouse_move' and last[0] == 'mouse_move':
+                calls[-1] = action
+            elif name == 'mouse_click' and last[0] == 'mouse_move':
+                _, x, y, button, clicks, speed = action
+                calls[-1] = action if x is not None else ('mouse_click', last[1], last[2], button, clicks, last[3])
+            elif name == 'mouse_click' and last[0] == 'mouse_click' and action[1] is None and last[3] == action[3]:
+                calls[-1] = last[:4] + (last[4] + action[4], last[5])
+            elif name == 'mouse_wheel' and last[0] == 'mouse_wheel' and last[1] == action[1]:
+                calls[-1] = ('mouse_wheel', last[1], last[2] + action[2])
+            else:
+                calls.append(action)
+        self._compiled = calls
+        return calls
+
+    def run(self, backend=None):
+        """Runs the compiled sequence; it can be run again.
+
+        :param backend: object with the functions of the autoit module receiving the calls, the autoit module itself
+        by default
+        :return: number of backend calls made for the actions
+        """
+        if backend is None:
+            from . import autoit as backend
+
+        calls = self.compile()
+        previous = [(option, backend.set_option(option, value)) for option, value in self.options.items()]
+        try:
+            for call in calls:
+                getattr(backend, call[0])(*call[1:])
+        finally:
+            for option, value in previous:
+                backend.set_option(option, value)
+        return len(calls)
+
+    def __len__(self):
+        return len(self.actions)
@@ -0,0 +1,262 @@
+"""A pure-Python compiler of the AutoIt Send syntax (see autoit.send) into key events, for sending keys with
+SendInput instead of AutoItX (see sendinput.py).
+
+An event is a tuple of vk, scan, flags, the fields of a KEYBDINPUT: a virtual-key press or release, or with
+KEYEVENTF_UNICODE a UTF-16 code unit typed as scan. LOCK_IF_ON and LOCK_IF_OFF mark the presses of {NUMLOCK on}-like
+keys to skip depending on the state of the lock, which only the sender can tell.
+"""
+from .cache import LRUCache
+
+KEYEVENTF_EXTENDEDKEY = 0x0001
+KEYEVENTF_KEYUP = 0x0002
+KEYEVENTF_UNICODE = 0x0004
+LOCK_IF_ON = 0x0100  # pressed only if the lock is on
+LOCK_IF_OFF = 0x0200  # pressed only if the lock is off
+
+VK_BACK = 0x08
+VK_TAB = 0x09
+VK_RETURN = 0x0D
+VK_SHIFT = 0x10
+VK_CONTROL = 0x11
+VK_MENU = 0x12
+VK_SPACE = 0x20
+VK_LWIN = 0x5B
+VK_RWIN = 0x5C
+VK_NUMPAD0 = 0x60
+
+_EXTENDED = 0x100  # marks the keys of the table sent with KEYEVENTF_EXTENDEDKEY
+
+# {NAME} -> virtual-key code, as in the table of autoit.send
+KEYS = {
+    'SPACE': VK_SPACE, 'ENTER': VK_RETURN, 'ALT': VK_MENU, 'SHIFT': VK_SHIFT, 'CTRL': VK_CONTROL,
+    'BACKSPACE': VK_BACK, 'BS': VK_BACK, 'DELETE': 0x2E | _EXTENDED, 'DEL': 0x2E | _EXTENDED,
+    'UP': 0x26 | _EXTENDED, 'DOWN': 0x28 | _EXTENDED, 'LEFT': 0x25 | _EXTENDED, 'RIGHT': 0x27 | _EXTENDED,
+    'HOME': 0x24 | _EXTENDED, 'END': 0x23 | _EXTENDED, 'ESCAPE': 0x1B, 'ESC': 0x1B,
+    'INSERT': 0x2D | _EXTENDED, 'INS': 0x2D | _EXTENDED, 'PGUP': 0x21 | _EXTENDED, 'PGDN': 0x22 | _EXTENDED,
+    'TAB': VK_TAB, 'PRINTSCREEN': 0x2C | _EXTENDED, 'LWIN': VK_LWIN | _EXTENDED, 'RWIN': VK_RWIN | _EXTENDED,
+    'NUMLOCK': 0x90 | _EXTENDED, 'CAPSLOCK': 0x14, 'SCROLLLOCK': 0x91, 'BREAK': 0x03 | _EXTENDED, 'PAUSE': 0x13,
+    'NUMPADMULT': 0x6A, 'NUMPADADD': 0x6B, 'NUMPADSUB': 0x6D, 'NUMPADDIV': 0x6F | _EXTENDED, 'NUMPADDOT': 0x6E,
+    'NUMPADENTER': VK_RETURN | _EXTENDED, 'APPSKEY': 0x5D | _EXTENDED,
+    'LALT': 0xA4, 'RALT': 0xA5 | _EXTENDED, 'LCTRL': 0xA2, 'RCTRL': 0xA3 | _EXTENDED, 'LSHIFT': 0xA0, 'RSHIFT': 0xA1,
+    'SLEEP': 0x5F, 'BROWSER_BACK': 0xA6, 'BROWSER_FORWARD': 0xA7, 'BROWSER_REFRESH': 0xA8, 'BROWSER_STOP': 0xA9,
+    'BROWSER_SEARCH': 0xAA, 'BROWSER_FAVORITES': 0xAB, 'BROWSER_HOME': 0xAC, 'VOLUME_MUTE': 0xAD,
+    'VOLUME_DOWN': 0xAE, 'VOLUME_UP': 0xAF, 'MEDIA_NEXT': 0xB0, 'MEDIA_PREV': 0xB1, 'MEDIA_STOP': 0xB2,
+    'MEDIA_PLAY_PAUSE': 0xB3, 'LAUNCH_MAIL': 0xB4, 'LAUNCH_MEDIA': 0xB5, 'LAUNCH_APP1': 0xB6, 'LAUNCH_APP2': 0xB7
+}
+KEYS.update(('F%d' % i, 0x6F + i) for i in range(1, 25))
+KEYS.update(('NUMPAD%d' % i, VK_NUMPAD0 + i) for i in range(10))
+_HELD = ('ALT', 'SHIFT', 'CTRL', 'LWIN', 'RWIN')  # {ALTDOWN}, {ALTUP}...
+_LOCKS = ('NUMLOCK', 'CAPSLOCK', 'SCROLLLOCK')
+
+# Modifier characters -> virtual-key code
+MODIFIERS = {'!': VK_MENU, '+': VK_SHIFT, '^': VK_CONTROL, '#': VK_LWIN | _EXTENDED}
+_MODIFIER_NAMES = {'!': 'ALT', '+': 'SHIFT', '^': 'CTRL', '#': 'LWIN'}
+
+# Virtual-key codes of the modifier keys, which {CTRLDOWN}, {LSHIFT down}... may hold across keystrokes
+_MODIFIER_VKS = frozenset([VK_SHIFT, VK_CONTROL, VK_MENU, VK_LWIN, VK_RWIN, 0xA0, 0xA1, 0xA2, 0xA3, 0xA4, 0xA5])
+_SHIFT_VKS = frozenset([VK_SHIFT, 0xA0, 0xA1])
+
+
+def _press(key, up=False):
+    # The event of a KEYS value
+    flags = (KEYEVENTF_EXTENDEDKEY if key & _EXTENDED else 0) | (KEYEVENTF_KEYUP if up else 0)
+    return key & 0xFF, 0, flags
+
+
+def _tap(key, events, extra=0):
+    vk, scan, flags = _press(key)
+    events.append((vk, scan, flags | extra))
+    events.append((vk, scan, flags | extra | KEYEVENTF_KEYUP))
+
+
+def _type(c, events):
+    # Types a character as UTF-16 code units, independently of the keyboard layout
+    code = ord(c)
+    units = [code] if code < 0x10000 else [0xD800 + ((code - 0x10000) >> 10), 0xDC00 + ((code - 0x10000) & 0x3FF)]
+    events.extend((0, unit, KEYEVENTF_UNICODE) for unit in units)
+    events.extend((0, unit, KEYEVENTF_UNICODE | KEYEVENTF_KEYUP) for unit in units)
+
+
+def _char_key(c):
+    # The key of a character typed with modifiers, which need a virtual key to make a shortcut, and whether the
+    # character needs SHIFT; None for characters typed as Unicode
+    if 'a' <= c <= 'z' or '0' <= c <= '9':
+        return ord(c.upper()), False
+    if 'A' <= c <= 'Z':
+        return ord(c), True
+    if c == ' ':
+        return VK_SPACE, False
+    return None
+
+
+_CONTROL_CHARS = {'\r': (VK_RETURN, False), '\n': (VK_RETURN, False), '\t': (VK_TAB, False)}
+
+
+def _char(c, modifiers, events, held=frozenset()):
+    # held: virtual-key codes of the modifiers held down by earlier keystrokes, which make shortcuts of characters
+    # just like modifiers do, and are left down
+    key = _CONTROL_CHARS.get(c)
+    if key is None and (modifiers or held):
+        key = _char_key(c)
+    if key is not None and key[1] and MODIFIERS['+'] not in modifiers and not held & _SHIFT_VKS:
+        modifiers = modifiers + [MODIFIERS['+']]
+    modifiers = [modifier for modifier in modifiers if modifier & 0xFF not in held]
+    for modifier in modifiers:
+        events.append(_press(modifier))
+    if key is None:
+        _type(c, events)
+    else:
+        _tap(key[0], events)
+    for modifier in reversed(modifiers):
+        events.append(_press(modifier, up=True))
+
+
+class SendSyntaxError(ValueError):
+    """A key sequence not following the Send syntax."""
+
+    def __init__(self, message, keys, position):
+        super(SendSyntaxError, self).__init__('%s at %d in %r' % (message, position, keys))
+        self.keys = keys
+        self.position = position
+
+
+def _check(name, arg, keys, position):
+    # The name and argument of {name arg}, normalized
+    upper = name.upper()
+    if upper == 'ASC':
+        if not arg.isdigit():
+            raise SendSyntaxError('{ASC nnnn} takes a decimal character code', keys, position)
+    elif upper.endswith('DOWN') and upper[:-4] in _HELD or upper.endswith('UP') and upper[:-2] in _HELD:
+        if arg:
+            raise SendSyntaxError('{%s} takes no argument' % name, keys, position)
+    elif upper in KEYS or len(name) == 1:
+        if arg in ('down', 'up'):
+            if upper not in KEYS and _char_key(name) is None:
+                raise SendSyntaxError('{%s %s} needs a key with a virtual-key code' % (name, arg), keys, position)
+        elif arg in ('on', 'off', 'toggle'):
+            if upper not in _LOCKS:
+                raise SendSyntaxError('only NUMLOCK, CAPSLOCK and SCROLLLOCK take on, off or toggle', keys, position)
+        elif arg and not arg.isdigit():
+            raise SendSyntaxError('{%s %s}: expected a count, "down" or "up"' % (name, arg), keys, position)
+    else:
+        raise SendSyntaxError('unknown key {%s}' % name, keys, position)
+    return (name if len(name) == 1 else upper), arg
+
+
+def tokenize(keys):
+    """Splits keys in the Send syntax into keystrokes, checking each of them.
+    Trailing modifiers, as in autoit.send_alt, press the modifier key itself.
+
+    :param keys: The sequence of keys to send
+    :return: list of tuples of modifiers, name, arg: the modifier characters applying to the keystroke; a single
+    character, or an upper case key name of KEYS, 'ASC', 'ALTDOWN'...; the lower case argument in braces, or ''
+    :raise SendSyntaxError: if keys is malformed
+    """
+    tokens, modifiers, i = [], u'', 0
+    while i < len(keys):
+        c = keys[i]
+        if c in MODIFIERS:
+            modifiers += c
+            i += 1
+            continue
+        if c == '{':
+            # The name may itself be '{' or '}', as in {{} and {}}
+            end = keys.find('}', i + 2)
+            if end < 0:
+                raise SendSyntaxError('unclosed {', keys, i)
+            name, _, arg = keys[i + 1:end].partition(' ')
+            tokens.append((modifiers,) + _check(name, arg.strip().lower(), keys, i))
+            i = end + 1
+        else:
+            tokens.append((modifiers, c, u''))
+            i += 1
+        modifiers = u''
+    if modifiers:
+        tokens.append((modifiers[:-1], _MODIFIER_NAMES[modifiers[-1]], u''))
+    return tokens
+
+
+def _keystroke(key, modifiers, events, held=frozenset()):
+    modifiers = [modifier for modifier in modifiers if modifier & 0xFF not in held]
+    for modifier in modifiers:
+        events.append(_press(modifier))
+    _tap(key, events)
+    for modifier in reversed(modifiers):
+        events.append(_press(modifier, up=True))
+
+
+def _hold(key, up, held):
+    # Keeps track of the modifiers held down
+    if key & 0xFF in _MODIFIER_VKS:
+        if up:
+            held.discard(key & 0xFF)
+        else:
+            held.add(key & 0xFF)
+    return _press(key, up)
+
+
+def _compile(tokens):
+    events, held = [], set()
+    for modifiers, name, arg in tokens:
+        modifiers = [MODIFIERS[m] for m in modifiers]
+        if name == 'ASC':
+            events.append(_press(VK_MENU))
+            for digit in arg:
+                _tap(VK_NUMPAD0 + int(digit), events)
+            events.append(_press(VK_MENU, up=True))
+        elif name.endswith('DOWN') and name[:-4] in _HELD:
+            events.append(_hold(KEYS[name[:-4]], False, held))
+        elif name.endswith('UP') and name[:-2] in _HELD:
+            events.append(_hold(KEYS[name[:-2]], True, held))
+        elif arg in ('down', 'up'):
+            events.append(_hold(KEYS[name] if name in KEYS else _char_key(name)[0], arg == 'up', held))
+        elif arg in ('on', 'off', 'toggle'):
+            _tap(KEYS[name], events, {'on': LOCK_IF_OFF, 'off': LOCK_IF_ON, 'toggle': 0}[arg])
+        else:
+            for _ in range(int(arg) if arg else 1):
+                if len(name) == 1:
+                    _char(name, modifiers, events, held)
+                else:
+                    _keystroke(KEYS[name], modifiers, events, held)
+    return events
+
+
+def parse(keys, flag=0):
+    """Compiles keys into key events.
+
+    :param keys: The sequence of keys to send, in the Send syntax
+    :param flag: 0 to process special characters like + and ! as autoit.send does, 1 to type keys as written
+    :return: list of tuples of vk, scan, flags
+    :raise SendSyntaxError: if keys is malformed
+    """
+    if flag != 1:
+        return _compile(tokenize(keys.replace(u'\r\n', u'\n')))
+    events = []
+    for c in keys.replace(u'\r\n', u'\n'):
+        _char(c, [], events)
+    return events
+
+
+compiled = LRUCache(maxsize=512)  # (keys, flag) -> tuple of events
+
+
+def compile_keys(keys, flag=0):
+    """Like parse, memoized in ``compiled``, for key sequences sent over and over.
+
+    :return: tuple of tuples of vk, scan, flags
+    """
+    events = compiled.get((keys, flag))
+    if events is None:
+        events = tuple(parse(keys, flag))
+        compiled.put((keys, flag), events)
+    return events
+
+
+def validate(keys, flag=0):
+    """Checks a key sequence, e.g. of a macro when it is loaded, and compiles it ahead of its first send.
+
+    :return: keys
+    :raise SendSyntaxError: if keys is malformed
+    """
+    compile_keys(keys, flag)
+    return keys
@@ -0,0 +1,626 @@
+"""Template matching on pixel arrays, the NumPy counterpart of ImageSearchDLL.
+
+A needle matches at an offset of the haystack when every channel of every pixel differs by at most ``tolerance``
+(0~255), which is what ``ImageSearch`` does with a ``*n`` option. Arrays are ``(height, width, channels)`` uint8 in
+BGR order, as grabbed from the screen; 2-D arrays are treated as single channel images.
+"""
+from multiprocessing.pool import ThreadPool
+import os
+import struct
+
+import numpy as np
+
+from .cache import LRUCache
+
+
+class Match(object):
+    """A found needle: its rectangle, its score (1.0 for an exact match, None if unknown) and the template's name.
+    Anchor positions are computed on access, and unpacking gives x, y, width, height.
+    """
+
+    __slots__ = ('x', 'y', 'width', 'height', 'score', 'template')
+
+    def __init__(self, x, y, width, height, score=None, template=None):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.score = score
+        self.template = template
+
+    @classmethod
+    def parse(cls, res, template=None):
+        """
+        :param res: reply of ImageSearchDLL.ImageSearch, b'1|x|y|width|height' on success
+        :return: a Match, or None
+        """
+        if isinstance(res, bytes):
+            res = res.decode('ascii')
+        if not res or res[:1] != '1':
+            return None
+        _, x, y, width, height = res.split('|', 4)
+        return cls(int(x), int(y), int(width), int(height), template=template)
+
+    @property
+    def top_left(self):
+        return self.x, self.y
+
+    @property
+    def top_right(self):
+        return self.x + self.width, self.y
+
+    @property
+    def bottom_left(self):
+        return self.x, self.y + self.height
+
+    @property
+    def bottom_right(self):
+        return self.x + self.width, self.y + self.height
+
+    @property
+    def center(self):
+        return int(self.x + self.width / 2), int(self.y + self.height / 2)
+
+    def anchor(self, position='top_left'):
+        """
+        :param position: 'top_left', 'top_right', 'bottom_left', 'bottom_right', 'center'
+        :return: tuple of x, y coordinates of selected position
+        """
+        return getattr(self, position)
+
+    def translate(self, dx, dy):
+        """Moves the match in place, e.g. from haystack to screen coordinates.
+
+        :return: the match itself
+        """
+        self.x += dx
+        self.y += dy
+        return self
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.width, self.height))
+
+    def __eq__(self, other):
+        return isinstance(other, Match) and tuple(self) == tuple(other) and self.template == other.template
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'Match(x=%r, y=%r, width=%r, height=%r, score=%r, template=%r)' % (
+            self.x, self.y, self.width, self.height, self.score, self.template)
+
+
+def _pixels(a):
+    a = np.asarray(a, dtype=np.uint8)
+    if a.ndim == 2:
+        a = a[:, :, None]
+    return a
+
+
+def _pick_samples(pixels, count):
+    # Pixels that differ most from the needle's mean color reject most offsets, so they are tested first; one pixel
+    # per distinct color, then a grid over the needle, keeps the samples from all landing in one flat patch
+    h, w, c = pixels.shape
+    flat = pixels.reshape(-1, c)
+    deviation = np.abs(flat - flat.mean(axis=0)).sum(axis=1)
+    order = np.argsort(-deviation, kind='mergesort')
+    _, first = np.unique(flat[order], axis=0, return_index=True)
+    chosen = order[np.sort(first)][:count].tolist()
+    grid = np.linspace(0, h * w - 1, count).astype(int).tolist()
+    chosen += [i for i in grid if i not in chosen][:count - len(chosen)]
+    return [divmod(i, w) for i in chosen]
+
+
+def _shrink(sums):
+    # Sums of 2x2 blocks, dropping an odd last row or column
+    h, w = sums.shape[0] // 2 * 2, sums.shape[1] // 2 * 2
+    sums = sums[0:h:2] + sums[1:h:2]
+    return sums[:, 0:w:2] + sums[:, 1:w:2]
+
+
+def _pyramid(levels, planes, level):
+    # levels[i] holds the channel sums over blocks of 2**(i+1) pixels, as uint32; the first halving is done in uint16,
+    # which holds the sums over 2x2 pixels of up to 4 channels
+    if not levels:
+        sums = planes[0].astype(np.uint16)
+        for plane in planes[1:]:
+            sums += plane
+        levels.append(_shrink(sums).astype(np.uint32))
+    while len(levels) < level:
+        levels.append(_shrink(levels[-1]))
+    return levels[level - 1]
+
+
+class Template(object):
+    """Needle pixels along with the statistics the matcher precomputes from them."""
+
+    def __init__(self, pixels, name=None, samples=16):
+        self.pixels = _pixels(pixels)
+        self.name = name
+        self.height, self.width, self.channels = self.pixels.shape
+        self.signed = self.pixels.astype(np.int16)
+        self.sum = int(self.pixels.sum(dtype=np.int64))
+        self.samples = _pick_samples(self.signed, samples)
+        self._levels = []
+
+    def level(self, level):
+        """
+        :param level: pyramid level, each one halving the size
+        :return: array of the channel sums over blocks of 2**level x 2**level pixels
+        """
+        return _pyramid(self._levels, [self.pixels[:, :, c] for c in range(self.channels)], level)
+
+
+def load_image(image_file):
+    """Decodes an image file into a BGR pixel array.
+    Uncompressed 24/32-bit bitmaps are read directly; other formats need PIL.
+
+    :param image_file: path of the image
+    :return: uint8 array of shape (height, width, 3)
+    """
+    with open(image_file, 'rb') as f:
+        data = f.read()
+
+    if data[:2] == b'BM':
+        offset, = struct.unpack_from('<I', data, 10)
+        width, height, _, bpp, compression = struct.unpack_from('<iiHHI', data, 18)
+        if bpp in (24, 32) and compression in (0, 3):
+            stride = (width * bpp // 8 + 3) & ~3
+            rows = np.frombuffer(data, np.uint8, stride * abs(height), offset).reshape(abs(height), stride)
+            pixels = rows[:, :width * bpp // 8].reshape(abs(height), width, bpp // 8)[:, :, :3]
+            if height > 0:  # bottom-up bitmap
+                pixels = pixels[::-1]
+            return np.ascontiguousarray(pixels)
+
+    from PIL import Image
+    return np.ascontiguousarray(np.asarray(Image.open(image_file).convert('RGB'))[:, :, ::-1])
+
+
+class TemplateCache(LRUCache):
+    """Decoded templates keyed by path and modification time, so a polling loop reads each file once.
+    Editing a file changes its mtime, and the stale entry simply ages out.
+    """
+
+    def __init__(self, maxsize=64, check_mtime=True):
+        """
+        :param maxsize: maximal number of templates kept in memory
+        :param check_mtime: stat the file on each lookup; without it a hit does no file I/O at all
+        """
+        super(TemplateCache, self).__init__(maxsize)
+        self.check_mtime = check_mtime
+
+    def load(self, image_file):
+        """
+        :param image_file: path of the image
+        :return: the Template of the file, decoded on a miss
+        """
+        key = image_file, os.path.getmtime(image_file) if self.check_mtime else None
+        tpl = self.get(key)
+        if tpl is None:
+            tpl = Template(load_image(image_file), name=image_file)
+            self.put(key, tpl)
+        return tpl
+
+
+templates = TemplateCache()
+
+
+def template(needle):
+    """
+    :param needle: a Template, a pixel array or the path of an image file, which is loaded through ``templates``
+    :return: a Template
+    """
+    if isinstance(needle, Template):
+        return needle
+    if isinstance(needle, np.ndarray):
+        return Template(needle)
+    return templates.load(needle)
+
+
+class Haystack(object):
+    """A pixel array prepared once for matching any number of needles against it."""
+
+    def __init__(self, pixels):
+        self.pixels = _pixels(pixels)
+        self.height, self.width = self.pixels.shape[:2]
+        self._planes = None
+        self._integrals = {}
+        self._levels = {}
+
+    @property
+    def planes(self):
+        # Contiguous channel planes make the full-map sample tests about twice as fast as strided views
+        if self._planes is None:
+            self._planes = [np.ascontiguousarray(self.pixels[:, :, c]) for c in range(self.pixels.shape[2])]
+        return self._planes
+
+    def level(self, channels, level):
+        """
+        :param channels: number of leading channels summed up, that of the needle
+        :param level: pyramid level, each one halving the size
+        :return: array of the channel sums over blocks of 2**level x 2**level pixels
+        """
+        planes = self._planes or [self.pixels[:, :, c] for c in range(self.pixels.shape[2])]
+        return _pyramid(self._levels.setdefault(channels, []), planes[:channels], level)
+
+    def integral(self, channels):
+        """Summed-area table of the sums of the first channels, padded with a leading row and column of zeros.
+        It is kept in uint32 and may wrap on large screens, which is harmless: window sums are differences taken
+        modulo 2**32 too, and the sum over any needle-sized window fits.
+        """
+        table = self._integrals.get(channels)
+        if table is None:
+            sums = self.planes[0].astype(np.uint32)
+            for plane in self.planes[1:channels]:
+                sums += plane
+            table = np.zeros((self.height + 1, self.width + 1), np.uint32)
+            np.cumsum(sums, axis=0, out=table[1:, 1:])
+            np.cumsum(table[1:, 1:], axis=1, out=table[1:, 1:])
+            self._integrals[channels] = table
+        return table
+
+
+def _as_haystack(pixels):
+    return pixels if isinstance(pixels, Haystack) else Haystack(pixels)
+
+
+# While more than this fraction of offsets survives, samples are tested over the whole map with array slices,
+# which beats gathering the survivors one by one
+_DENSE = 0.01
+
+# The summed-area test costs a few sample passes, so it only runs when the first sample leaves this many offsets
+_INTEGRAL_DENSE = 0.1
+
+
+def _sample_mask(hay, tpl, rows, cols, sample, tolerance, mask=None):
+    dy, dx = sample
+    for plane, value in zip(hay.planes, tpl.signed[dy, dx].tolist()):
+        window = plane[dy:dy + rows, dx:dx + cols]
+        if value - tolerance > 0:
+            mask = window >= value - tolerance if mask is None else np.logical_and(mask, window >= value - tolerance, out=mask)
+        if value + tolerance < 255:
+            mask = window <= value + tolerance if mask is None else np.logical_and(mask, window <= value + tolerance, out=mask)
+    return np.ones((rows, cols), bool) if mask is None else mask
+
+
+def _candidates(hay, tpl, tolerance):
+    h, w = tpl.height, tpl.width
+    rows, cols = hay.height - h + 1, hay.width - w + 1
+    if rows <= 0 or cols <= 0:
+        return np.empty(0, np.intp), np.empty(0, np.intp)
+
+    samples = iter(tpl.samples)
+    mask = _sample_mask(hay, tpl, rows, cols, next(samples), tolerance)
+
+    # A window within tolerance per channel has a channel sum within tolerance * area * channels of the needle's
+    if np.count_nonzero(mask) > _INTEGRAL_DENSE * mask.size:
+        table = hay.integral(tpl.channels)
+        sums = (table[h:, w:] - table[:rows, w:] - table[h:, :cols] + table[:rows, :cols]).astype(np.int64)
+        mask &= np.abs(sums - tpl.sum) <= tolerance * h * w * tpl.channels
+
+    for sample in samples:
+        if np.count_nonzero(mask) <= _DENSE * mask.size:
+            break
+        _sample_mask(hay, tpl, rows, cols, sample, tolerance, mask)
+
+    ys, xs = np.nonzero(mask)
+    return _filter_samples(hay, tpl, ys, xs, samples, tolerance)
+
+
+def _filter_samples(hay, tpl, ys, xs, samples, tolerance):
+    pixels = hay.pixels[:, :, :tpl.channels]  # e.g. BGRA screen grabs against BGR needles
+    for dy, dx in samples:
+        if not len(ys):
+            break
+        diff = pixels[ys + dy, xs + dx].astype(np.int16) - tpl.signed[dy, dx]
+        keep = (np.abs(diff) <= tolerance).all(axis=1)
+        ys, xs = ys[keep], xs[keep]
+    return ys, xs
+
+
+def _difference(hay, tpl, y, x):
+    window = hay.pixels[y:y + tpl.height, x:x + tpl.width, :tpl.channels]
+    return np.abs(window.astype(np.int16) - tpl.signed)
+
+
+def find(haystack, needle, tolerance=100):
+    """Finds the first occurrence of needle in haystack, scanning rows top to bottom like ImageSearch.
+
+    :param haystack: a Haystack or a pixel array to search in
+    :param needle: a Template, a pixel array or the path of an image file
+    :param tolerance: 0~255; 0 for no tolerance
+    :return: a Match in haystack coordinates, or None
+    """
+    tpl = template(needle)
+    hay = _as_haystack(haystack)
+    ys, xs = _candidates(hay, tpl, tolerance)
+    for y, x in zip(ys.tolist(), xs.tolist()):
+        diff = _difference(hay, tpl, y, x)
+        if diff.max() <= tolerance:
+            return Match(x, y, tpl.width, tpl.height, float(1.0 - diff.mean() / 255.0), tpl.name)
+    return None
+
+
+def _window_sums(a, h, w):
+    table = np.zeros((a.shape[0] + 1, a.shape[1] + 1))
+    np.cumsum(a, axis=0, out=table[1:, 1:])
+    np.cumsum(table[1:, 1:], axis=1, out=table[1:, 1:])
+    return table[h:, w:] - table[:-h, w:] - table[h:, :-w] + table[:-h, :-w]
+
+
+def _ssd(hay, needle):
+    # Sum of squared differences at every offset: sum(H^2) - 2 * correlate(H, N) + sum(N^2), correlating through
+    # FFT. A transform the size of hay is enough, as the valid offsets never wrap around
+    h, w = needle.shape
+    shape = hay.shape
+    corr = np.fft.irfft2(np.fft.rfft2(hay) * np.fft.rfft2(needle[::-1, ::-1], shape), shape)[h - 1:, w - 1:]
+    return _window_sums(hay * hay, h, w) - 2 * corr + (needle * needle).sum()
+
+
+def _local_minima(ssd, count):
+    # The best offsets of a coarse map tend to crowd around one spot, so only 3x3 local minima compete
+    padded = np.pad(ssd, 1, mode='constant', constant_values=np.inf)
+    minima = np.ones(ssd.shape, bool)
+    for dy in range(3):
+        for dx in range(3):
+            if dy != 1 or dx != 1:
+                minima &= ssd <= padded[dy:dy + ssd.shape[0], dx:dx + ssd.shape[1]]
+    ys, xs = np.nonzero(minima)
+    if len(ys) > count:
+        best = np.argpartition(ssd[ys, xs], count)[:count]
+        ys, xs = ys[best], xs[best]
+    return ys, xs
+
+
+def _neighborhood(ys, xs, lo, hi, rows, cols):
+    # Every offset within [lo, hi] of the given ones, clipped to rows x cols, without duplicates
+    d = np.arange(lo, hi + 1)
+    ny = np.clip((ys[:, None, None] + d[None, :, None]).repeat(len(d), axis=2), 0, rows - 1).ravel()
+    nx = np.clip((xs[:, None, None] + d[None, None, :]).repeat(len(d), axis=1), 0, cols - 1).ravel()
+    unique = np.unique(ny * cols + nx)
+    return unique // cols, unique % cols
+
+
+def _refine(hay, needle, ys, xs):
+    # Moves each coarse offset, doubled, to the best one around it at this level
+    h, w = needle.shape
+    rows, cols = hay.shape[0] - h + 1, hay.shape[1] - w + 1
+    best_y, best_x = [], []
+    for y, x in zip((ys * 2).tolist(), (xs * 2).tolist()):
+        ny, nx = _neighborhood(np.array([y]), np.array([x]), -1, 2, rows, cols)
+        windows = hay[ny[:, None, None] + np.arange(h)[:, None], nx[:, None, None] + np.arange(w)]
+        i = ((windows.astype(np.int64) - needle) ** 2).reshape(len(ny), -1).sum(axis=1).argmin()
+        best_y.append(ny[i])
+        best_x.append(nx[i])
+    return np.array(best_y, np.intp), np.array(best_x, np.intp)
+
+
+def find_coarse(haystack, needle, tolerance=100, levels=2, candidates=8):
+    """Finds needle in haystack coarse to fine, which pays off on large screens and needles.
+    The channel sums are matched at 1/2**levels scale first; the best candidates are refined level by level and
+    verified at full resolution with the usual tolerance. A match is found only if it is among the candidates, so
+    raising candidates trades speed for agreement with find(), which tests every offset.
+
+    :param haystack: a Haystack or a pixel array to search in
+    :param needle: a Template, a pixel array or the path of an image file
+    :param tolerance: 0~255; 0 for no tolerance
+    :param levels: number of times the images are halved; fewer are used if the needle would shrink below 4 pixels
+    :param candidates: number of coarse candidates refined
+    :return: a Match in haystack coordinates, or None
+    """
+    tpl = template(needle)
+    hay = _as_haystack(haystack)
+    levels = min(levels, int(np.log2(min(tpl.height, tpl.width) / 4.0)) if min(tpl.height, tpl.width) >= 8 else 0)
+    if levels <= 0:
+        return find(hay, tpl, tolerance)
+
+    coarse = hay.level(tpl.channels, levels)
+    if coarse.shape[0] < tpl.level(levels).shape[0] or coarse.shape[1] < tpl.level(levels).shape[1]:
+        return None
+    ys, xs = _local_minima(_ssd(coarse.astype(np.float64), tpl.level(levels).astype(np.float64)), candidates)
+    for level in range(levels - 1, 0, -1):
+        ys, xs = _refine(hay.level(tpl.channels, level), tpl.level(level), ys, xs)
+
+    rows, cols = hay.height - tpl.height + 1, hay.width - tpl.width + 1
+    ys, xs = _neighborhood(ys * 2, xs * 2, -2, 3, rows, cols)
+    ys, xs = _filter_samples(hay, tpl, ys, xs, tpl.samples, tolerance)
+    largest, mean = _differences(hay, tpl, ys, xs)
+    found = np.nonzero(largest <= tolerance)[0]
+    if not len(found):
+        return None
+    i = found[np.lexsort((xs[found], ys[found]))[0]]
+    return Match(int(xs[i]), int(ys[i]), tpl.width, tpl.height, float(1.0 - mean[i] / 255.0), tpl.name)
+
+
+def _differences(hay, tpl, ys, xs, batch=256):
+    # Largest and mean channel difference of the needle against each candidate window, gathered in batches
+    dy = np.arange(tpl.height)[:, None]
+    dx = np.arange(tpl.width)[None, :]
+    pixels = hay.pixels[:, :, :tpl.channels]
+    largest, mean = [], []
+    for i in range(0, len(ys), batch):
+        windows = pixels[ys[i:i + batch, None, None] + dy, xs[i:i + batch, None, None] + dx]
+        diff = np.abs(windows.astype(np.int16) - tpl.signed).reshape(len(windows), -1)
+        largest.append(diff.max(axis=1))
+        mean.append(diff.mean(axis=1))
+    if not largest:
+        return np.empty(0, np.int16), np.empty(0)
+    return np.concatenate(largest), np.concatenate(mean)
+
+
+def _suppress(xs, ys, scores, w, h, overlap, max_results):
+    # Greedy non-maximum suppression. All boxes share the needle's size, so the offsets a kept box suppresses form a
+    # fixed stencil, stamped onto a map of suppressed offsets; each candidate then costs a single lookup
+    ix = w - np.abs(np.arange(1 - w, w))
+    iy = h - np.abs(np.arange(1 - h, h))
+    inter = iy[:, None] * ix[None, :]
+    stencil = inter > overlap * (2 * w * h - inter)
+
+    suppressed = np.zeros((int(ys.max()) + 1, int(xs.max()) + 1), bool) if len(xs) else None
+    kept = []
+    for i in np.argsort(-scores, kind='mergesort').tolist():
+        x, y = int(xs[i]), int(ys[i])
+        if suppressed[y, x]:
+            continue
+        kept.append(i)
+        if len(kept) == max_results:
+            break
+        top, left = max(y - h + 1, 0), max(x - w + 1, 0)
+        area = suppressed[top:y + h, left:x + w]
+        area |= stencil[top - (y - h + 1):top - (y - h + 1) + area.shape[0],
+                        left - (x - w + 1):left - (x - w + 1) + area.shape[1]]
+    return kept
+
+
+def _score_bounds(hay, tpl, ys, xs):
+    # Upper bounds of the scores of candidate windows: the mean channel difference is at least the difference of the
+    # channel sums over the needle's area, which the summed-area table gives in four lookups per window
+    h, w = tpl.height, tpl.width
+    table = hay.integral(tpl.channels)
+    sums = (table[ys + h, xs + w] - table[ys, xs + w] - table[ys + h, xs] + table[ys, xs]).astype(np.int64)
+    return 1.0 - np.abs(sums - tpl.sum) / (255.0 * h * w * tpl.channels)
+
+
+def _find_best(hay, tpl, ys, xs, tolerance, threshold, overlap, max_results, batch=256):
+    # Verifies the candidates by decreasing score bound, in growing batches, and stops once max_results kept matches
+    # score at least the bound of every candidate left: those could neither beat nor suppress them
+    bounds = _score_bounds(hay, tpl, ys, xs)
+    order = np.argsort(-bounds, kind='mergesort')
+    order = order[bounds[order] >= threshold]
+    ys, xs, bounds = ys[order], xs[order], bounds[order]
+
+    chunks = []  # tuples of ys, xs, scores of the verified matches of each batch
+    found_ys, found_xs, found_scores = np.empty(0, np.intp), np.empty(0, np.intp), np.empty(0)
+    kept, done = [], 0
+    while done < len(ys):
+        end = min(done + batch, len(ys))
+        largest, mean = _differences(hay, tpl, ys[done:end], xs[done:end])
+        scores = 1.0 - mean / 255.0
+        keep = (largest <= tolerance) & (scores >= threshold)
+        chunks.append((ys[done:end][keep], xs[done:end][keep], scores[keep]))
+        done, batch = end, batch * 2
+
+        found_ys, found_xs, found_scores = [np.concatenate(column) for column in zip(*chunks)]
+        kept = _suppress(found_xs, found_ys, found_scores, tpl.width, tpl.height, overlap, max_results)
+        if len(kept) == max_results and (done == len(ys) or found_scores[kept].min() >= bounds[done]):
+            break
+    return found_ys, found_xs, found_scores, kept
+
+
+def find_all(haystack, needle, tolerance=100, threshold=0.0, overlap=0.3, max_results=None):
+    """Finds every occurrence of needle in haystack, e.g. to count icons or list rows.
+    The score of a match is 1 minus the mean channel difference over 255, so an exact match scores 1.0.
+    Of matches overlapping by more than ``overlap`` (intersection over union), only the best scoring one is kept.
+    With max_results, candidates are verified best first and the search stops as soon as the best matches are known;
+    matches of equal scores may then come out in a different order than without it.
+
+    :param haystack: a Haystack or a pixel array to search in
+    :param needle: a Template, a pixel array or the path of an image file
+    :param tolerance: 0~255; 0 for no tolerance
+    :param threshold: minimal score of a match, 0~1
+    :param overlap: 0~1; 0 to keep no overlapping matches at all
+    :param max_results: maximal number of matches to return, None for no limit
+    :return: list of Matches in haystack coordinates, best score first
+    """
+    if max_results is not None and max_results <= 0:
+        return []
+    tpl = template(needle)
+    hay = _as_haystack(haystack)
+    ys, xs = _candidates(hay, tpl, tolerance)
+    if max_results is None:
+        largest, mean = _differences(hay, tpl, ys, xs)
+        scores = 1.0 - mean / 255.0
+        keep = (largest <= tolerance) & (scores >= threshold)
+        ys, xs, scores = ys[keep], xs[keep], scores[keep]
+        kept = _suppress(xs, ys, scores, tpl.width, tpl.height, overlap, None)
+    else:
+        ys, xs, scores, kept = _find_best(hay, tpl, ys, xs, tolerance, threshold, overlap, max_results)
+    return [Match(int(xs[i]), int(ys[i]), tpl.width, tpl.height, float(scores[i]), tpl.name) for i in kept]
+
+
+class LocalityCache(object):
+    """Remembers where each template was last found: UI elements mostly show up where they were before, so a small
+    window around the last hit is searched first, and the whole area only when that misses.
+    """
+
+    def __init__(self, margin=32, maxsize=256):
+        """
+        :param margin: number of pixels the window extends beyond the last hit on each side
+        :param maxsize: maximal number of templates remembered
+        """
+        self.margin = margin
+        self.hits = 0  # found in the window around the last hit
+        self.fallbacks = 0  # not found there, so the whole area was searched
+        self._last = LRUCache(maxsize)
+
+    def window(self, key, x, y, width, height):
+        """
+        :return: tuple of x, y, width, height of the window around the last hit of key, clipped to the given area,
+        or None if there is no such hit
+        """
+        last = self._last.get(key)
+        if last is None:
+            return None
+        left, top = max(last.x - self.margin, x), max(last.y - self.margin, y)
+        right = min(last.x + last.width + self.margin, x + width)
+        bottom = min(last.y + last.height + self.margin, y + height)
+        if right - left < last.width or bottom - top < last.height:
+            return None
+        return left, top, right - left, bottom - top
+
+    def search(self, key, x, y, width, height, search):
+        """
+        :param key: the template, any hashable identifying it: an image path or a Template, not a pixel array
+        :param search: function of x, y, width, height of an area, returning a Match or None
+        :return: the result of search
+        :raise TypeError: if key is a pixel array
+        """
+        if isinstance(key, np.ndarray):
+            raise TypeError('a pixel array cannot key the locality cache, wrap it once in a matcher.Template')
+        window = self.window(key, x, y, width, height)
+        if window is not None:
+            res = search(*window)
+            if res is not None:
+                self.hits += 1
+                self._last.put(key, res)
+                return res
+            self.fallbacks += 1
+
+        res = search(x, y, width, height)
+        if res is None:
+            self._last.pop(key)
+        else:
+            self._last.put(key, res)
+        return res
+
+    def clear(self):
+        self._last.clear()
+        self.hits = self.fallbacks = 0
+
+
+_pool = None
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPool()
+    return _pool
+
+
+def find_many(haystack, needles, tolerance=100, parallel=True):
+    """Finds the first occurrence of each needle in one haystack.
+    The needles are matched on a shared thread pool, since NumPy releases the GIL in the heavy passes.
+
+    :param haystack: a Haystack or a pixel array to search in
+    :param needles: list of Templates, pixel arrays or image file paths
+    :param tolerance: 0~255; 0 for no tolerance
+    :param parallel: False to match the needles one after another in the calling thread
+    :return: list of the find() results, in the order of needles
+    """
+    hay = _as_haystack(haystack)
+    tpls = [template(needle) for needle in needles]
+    if not parallel or len(tpls) < 2:
+        return [find(hay, tpl, tolerance) for tpl in tpls]
+    return _get_pool().map(lambda tpl: find(hay, tpl, tolerance), tpls)
@@ -0,0 +1,113 @@
+"""Module maps of processes, cached per process, for resolving many addresses to the modules containing them."""
+from bisect import bisect_right
+
+from . import process
+from .cache import LRUCache
+from .process import _name_key
+
+
+class ModuleMap(object):
+    """The modules of a process, sorted by base address."""
+
+    def __init__(self, modules):
+        """
+        :param modules: list of module dicts, as returned by process.get_process_modules
+        """
+        self.modules = sorted(modules, key=lambda m: m['base_address'])
+        self._bases = [m['base_address'] for m in self.modules]
+        self._by_name = {}
+        for m in self.modules:
+            self._by_name.setdefault(_name_key(m['name']), m)
+
+    def find_module(self, name):
+        """
+        :param name: the name of the module, e.g. "kernel32.dll", compared case-insensitively
+        :return: the module dict, the lowest one if several have that name, or None
+        """
+        return self._by_name.get(_name_key(name))
+
+    def address_to_module(self, address):
+        """
+        :param address: an address in the process
+        :return: the module dict whose range contains the address, or None
+        """
+        i = bisect_right(self._bases, address) - 1
+        if i >= 0:
+            m = self.modules[i]
+            if address < m['base_address'] + m['base_size']:
+                return m
+        return None
+
+    def __len__(self):
+        return len(self.modules)
+
+    def __iter__(self):
+        return iter(self.modules)
+
+
+class ModuleCache(LRUCache):
+    """Module maps keyed by pid and process start time. Modules rarely change once a process has started, so each
+    process's modules are snapshotted once; a process reusing a pid has another start time, and gets its own map.
+    """
+
+    def __init__(self, maxsize=256):
+        """
+        :param maxsize: maximal number of processes whose maps are kept
+        """
+        super(ModuleCache, self).__init__(maxsize)
+
+    def modules(self, pid, errors=None):
+        """
+        :param pid: the PID of the process
+        :param errors: list to append a ProcessError to for each failed lookup
+        :return: the ModuleMap of the process, snapshotted on a miss. Failed snapshots are not cached, and the maps of
+        a process that cannot be opened any more are dropped
+        """
+        start_time = process.get_start_time(pid, errors)
+        if start_time is None:
+            self.forget(pid)
+            return ModuleMap(process.get_process_modules(pid, errors))
+
+        key = pid, start_time
+        module_map = self.get(key)
+        if module_map is None:
+            self.forget(pid)  # a process which exited, leaving its pid to this one
+            errs = []
+            module_map = ModuleMap(process.get_process_modules(pid, errs))
+            if not errs:
+                self.put(key, module_map)
+            elif errors is not None:
+                errors.extend(errs)
+        return module_map
+
+    def find_module(self, pid, name, errors=None):
+        """
+        :return: the module dict of that name in the process, or None; see ModuleMap.find_module
+        """
+        return self.modules(pid, errors).find_module(name)
+
+    def address_to_module(self, pid, address, errors=None):
+        """Checks the process start time on each call; to resolve many addresses, use the map of modules() instead.
+
+        :return: the module dict whose range contains the address in the process, or None
+        """
+        return self.modules(pid, errors).address_to_module(address)
+
+    def forget(self, pid):
+        """Drops the maps of a pid, e.g. when its process exits."""
+        for key in self.keys():
+            if key[0] == pid:
+                self.pop(key)
+
+    def prune(self, pids):
+        """Drops the maps of the processes that are not running any more.
+
+        :param pids: the PIDs of the running processes, e.g. from process.get_process_table().pids
+        """
+        pids = set(pids)
+        for key in self.keys():
+            if key[0] not in pids:
+                self.pop(key)
+
+
+modules = ModuleCache()
@@ -0,0 +1,152 @@
+"""Pixel probes answered from captured frames, instead of one AutoItX call per pixel.
+
+Colors are decimal values of 0xRRGGBB, as returned by ``autoit.pixel_get_color``.
+"""
+import time
+
+import numpy as np
+
+from . import capture
+
+
+def _colors(pixels):
+    # BGRA pixels to 0xRRGGBB values
+    pixels = pixels.astype(np.int64)
+    return pixels[..., 2] << 16 | pixels[..., 1] << 8 | pixels[..., 0]
+
+
+def get_colors(points, frame=None):
+    """Returns the colors of many pixels from one grab.
+
+    :param points: list of tuples of x, y screen coordinates
+    :param frame: capture.Frame to read from; by default the bounding box of the points is grabbed
+    :return: list of decimal values of the pixels' colors, -1 for points outside the frame
+    """
+    if not len(points):
+        return []
+    points = np.asarray(points, np.int64).reshape(-1, 2)
+    xs, ys = points[:, 0], points[:, 1]
+    if frame is None:
+        left, top = int(xs.min()), int(ys.min())
+        frame = capture.grab(left, top, int(xs.max()) - left + 1, int(ys.max()) - top + 1)
+
+    xs, ys = xs - frame.x, ys - frame.y
+    inside = (xs >= 0) & (ys >= 0) & (xs < frame.width) & (ys < frame.height)
+    colors = np.full(len(points), -1, np.int64)
+    colors[inside] = _colors(frame.pixels[ys[inside], xs[inside]])
+    return colors.tolist()
+
+
+def _mask(pixels, color, shade_variation):
+    # Pixels whose every channel is within shade_variation of color's
+    mask = None
+    for c, value in enumerate(((color >> 0) & 0xFF, (color >> 8) & 0xFF, (color >> 16) & 0xFF)):
+        channel = pixels[:, :, c]
+        if value - shade_variation > 0:
+            mask = channel >= value - shade_variation if mask is None else mask & (channel >= value - shade_variation)
+        if value + shade_variation < 255:
+            mask = channel <= value + shade_variation if mask is None else mask & (channel <= value + shade_variation)
+    return np.ones(pixels.shape[:2], bool) if mask is None else mask
+
+
+def search(left, top, right, bottom, color, shade_variation=0, step=1, find_all=False, frame=None):
+    """Searches a rectangle of pixels for a color, scanning left to right, top to bottom, like AutoIt's PixelSearch.
+
+    :param left: left coordinate of rectangle
+    :param top: top coordinate of rectangle
+    :param right: right coordinate of rectangle, inclusive
+    :param bottom: bottom coordinate of rectangle, inclusive
+    :param color: decimal value of the color, e.g. 0xFF0000 for red
+    :param shade_variation: 0~255, how far each of the red, green and blue components may differ from color's
+    :param step: check every step-th pixel in both directions (for speed)
+    :param find_all: return every matching pixel instead of the first one
+    :param frame: capture.Frame containing the rectangle; by default the rectangle is grabbed
+    :return: tuple of x, y coordinates of the first match, or (False, False);
+    with find_all, list of tuples of x, y coordinates
+    """
+    width, height = right - left + 1, bottom - top + 1
+    if frame is None:
+        frame = capture.grab(left, top, width, height)
+    else:
+        frame = frame.crop(left, top, width, height)
+
+    mask = _mask(frame.pixels[::step, ::step], color, shade_variation)
+    if find_all:
+        ys, xs = np.nonzero(mask)
+        return list(zip((left + xs * step).tolist(), (top + ys * step).tolist()))
+
+    i = int(mask.argmax())
+    if not mask.flat[i]:
+        return False, False
+    y, x = divmod(i, mask.shape[1])
+    return left + x * step, top + y * step
+
+
+class ChangeDetector(object):
+    """Tells which tiles of a rectangle changed between grabs, replacing polling autoit.pixel_checksum over it.
+    Every tile keeps a hash: the sum of its BGRA pixels, as 32-bit words, times random odd weights, which any single
+    pixel change alters.
+    """
+
+    def __init__(self, left, top, right, bottom, tile=32):
+        """
+        :param left: left coordinate of rectangle
+        :param top: top coordinate of rectangle
+        :param right: right coordinate of rectangle, inclusive
+        :param bottom: bottom coordinate of rectangle, inclusive
+        :param tile: width and height of the tiles, in pixels
+        """
+        self.left, self.top = left, top
+        self.width, self.height = right - left + 1, bottom - top + 1
+        self.tile = tile
+        self._rows = np.arange(0, self.height, tile)
+        self._cols = np.arange(0, self.width, tile)
+        self._weights = np.random.RandomState(0).randint(0, 1 << 31, (self.height, self.width)).astype(np.uint32)
+        self._weights |= 1
+        self.hashes = None
+
+    def _hash(self, pixels):
+        words = np.ascontiguousarray(pixels).view(np.uint32)[:, :, 0]
+        products = (words * self._weights).astype(np.uint64)
+        return np.add.reduceat(np.add.reduceat(products, self._rows, axis=0), self._cols, axis=1)
+
+    def update(self, frame=None):
+        """Grabs the rectangle and compares it with the previous grab.
+
+        :param frame: capture.Frame containing the rectangle; by default the rectangle is grabbed
+        :return: list of tuples of x, y, width, height of the changed tiles, empty on the first call
+        """
+        if frame is None:
+            frame = capture.grab(self.left, self.top, self.width, self.height)
+        else:
+            frame = frame.crop(self.left, self.top, self.width, self.height)
+
+        hashes = self._hash(frame.pixels)
+        previous, self.hashes = self.hashes, hashes
+        if previous is None:
+            return []
+        rows, cols = np.nonzero(hashes != previous)
+        return [(self.left + x, self.top + y, min(self.tile, self.width - x), min(self.tile, self.height - y))
+                for y, x in zip((rows * self.tile).tolist(), (cols * self.tile).tolist())]
+
+
+def wait_for_change(left, top, right, bottom, timeout=0, interval=0.05, tile=32):
+    """Pauses script execution until something changes in a rectangle of pixels.
+
+    :param left: left coordinate of rectangle
+    :param top: top coordinate of rectangle
+    :param right: right coordinate of rectangle, inclusive
+    :param bottom: bottom coordinate of rectangle, inclusive
+    :param timeout: Specifies how long to wait, in seconds (default 0 is to wait indefinitely)
+    :param interval: time between grabs, in seconds
+    :param tile: width and height of the tiles, in pixels
+    :return: list of tuples of x, y, width, height of the changed tiles, empty if the wait timed out
+    """
+    detector = ChangeDetector(left, top, right, bottom, tile)
+    detector.update()
+    deadline = time.time() + timeout
+    while True:
+        time.sleep(interval if not timeout else max(min(interval, deadline - time.time()), 0))
+        changed = detector.update()
+        if changed or timeout and time.time() >= deadline:
+            return changed
@@ -1,7 +1,15 @@
+from collections import namedtuple
 from ctypes import *
+import numbers
+import os
+import threading
+import time
 
-kernel32 = windll.kernel32
-advapi32 = windll.advapi32
+from .proctable import ProcessTable
+
+if os.name == 'nt':
+    kernel32 = windll.kernel32
+    advapi32 = windll.advapi32
 
 INVALID_HANDLE_VALUE = -1
 MAX_PATH = 260
@@ -13,6 +21,14 @@ TH32CS_SNAPTHREAD = 0x00000004
 SYNCHRONIZE = 1048576
 STANDARD_RIGHTS_REQUIRED = 983040
 PROCESS_ALL_ACCESS = (STANDARD_RIGHTS_REQUIRED | SYNCHRONIZE | 4095)
+PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+WAIT_OBJECT_0 = 0
+WAIT_TIMEOUT = 258
+WAIT_FAILED = 0xFFFFFFFF
+INFINITE = 0xFFFFFFFF
+MAXIMUM_WAIT_OBJECTS = 64
+ERROR_INVALID_PARAMETER = 87
+ERROR_CANCELLED = 1223
 
 
 class PROCESSENTRY32(Structure):
@@ -57,17 +73,20 @@ class THREADENTRY32(Structure):
     ]
 
 
-kernel32.CreateToolhelp32Snapshot.argtypes = [c_ulong, c_ulong]
-kernel32.CloseHandle.argtypes = [c_void_p]
-kernel32.OpenProcessToken.argtypes = [c_void_p, c_ulong, POINTER(c_void_p)]
-kernel32.OpenProcess.argtypes = [c_ulong, c_bool, c_ulong]
-kernel32.OpenProcess.restype = c_void_p
-kernel32.Process32First.argtypes = [c_void_p, POINTER(PROCESSENTRY32)]
-kernel32.Process32Next.argtypes = [c_void_p, POINTER(PROCESSENTRY32)]
-kernel32.Module32First.argtypes = [c_void_p, POINTER(MODULEENTRY32)]
-kernel32.Module32Next.argtypes = [c_void_p, POINTER(MODULEENTRY32)]
-kernel32.Thread32First.argtypes = [c_void_p, POINTER(THREADENTRY32)]
-kernel32.Thread32Next.argtypes = [c_void_p, POINTER(THREADENTRY32)]
+if os.name == 'nt':
+    kernel32.CreateToolhelp32Snapshot.argtypes = [c_ulong, c_ulong]
+    kernel32.CloseHandle.argtypes = [c_void_p]
+    kernel32.OpenProcess.argtypes = [c_ulong, c_bool, c_ulong]
+    kernel32.OpenProcess.restype = c_void_p
+    kernel32.Process32First.argtypes = [c_void_p, POINTER(PROCESSENTRY32)]
+    kernel32.Process32Next.argtypes = [c_void_p, POINTER(PROCESSENTRY32)]
+    kernel32.Module32First.argtypes = [c_void_p, POINTER(MODULEENTRY32)]
+    kernel32.Module32Next.argtypes = [c_void_p, POINTER(MODULEENTRY32)]
+    kernel32.Thread32First.argtypes = [c_void_p, POINTER(THREADENTRY32)]
+    kernel32.Thread32Next.argtypes = [c_void_p, POINTER(THREADENTRY32)]
+    kernel32.GetProcessTimes.argtypes = [c_void_p] + [POINTER(c_ulonglong)] * 4
+    kernel32.WaitForMultipleObjects.argtypes = [c_ulong, POINTER(c_void_p), c_bool, c_ulong]
+    kernel32.WaitForMultipleObjects.restype = c_ulong
 
 
 FORMAT_MESSAGE_FROM_SYSTEM = 0x00001000
@@ -77,133 +96,681 @@ LANG_NEUTRAL = 0x0000
 SUBLANG_DEFAULT = 0x0400
 
 
-def get_last_error(context=''):
-    enum = kernel32.GetLastError()
-    msg = create_string_buffer(256)
-    kernel32.FormatMessageA(FORMAT_MESSAGE_FROM_SYSTEM | FORMAT_MESSAGE_IGNORE_INSERTS,
-         None, enum,
-         MAKELANGID(LANG_NEUTRAL, SUBLANG_DEFAULT),  # Default language
-         msg, 256, None)
-    if context:
-        print context, ': ',
-    print enum,
-    print msg.value.decode('gbk')
-
-
-def get_process_list():
-    thread_list = get_threads()  # get list of all threads
-
-    hProcessSnap = kernel32.CreateToolhelp32Snapshot(TH32CS_SNAPPROCESS, 0)
-    if not hProcessSnap:
-        get_last_error('CreateToolhelp32Snapshot')
+class ProcessError(namedtuple('ProcessError', ['code', 'context', 'pid'])):
+    """A failed lookup about a process.
+    code is the Windows error code (the errno with procfs), WAIT_TIMEOUT for a lookup that timed out, None for a
+    Python exception; context tells what failed; pid is the process's, None if the failure was not about one process.
+    """
+    __slots__ = ()
+
+    @property
+    def message(self):
+        """
+        :return: the system's text for code, or context if there is no code
+        """
+        return self.context if self.code is None else format_message(self.code)
+
+
+_messages = {}  # error code -> text
+
+
+def format_message(code):
+    """
+    :return: the system's text for an error code, formatted on first use and then reused
+    """
+    message = _messages.get(code)
+    if message is None:
+        if os.name == 'nt':
+            msg = create_string_buffer(256)
+            kernel32.FormatMessageA(FORMAT_MESSAGE_FROM_SYSTEM | FORMAT_MESSAGE_IGNORE_INSERTS,
+                 None, code,
+                 MAKELANGID(LANG_NEUTRAL, SUBLANG_DEFAULT),  # Default language
+                 msg, 256, None)
+            message = msg.value.decode('mbcs').strip()
+        else:
+            message = os.strerror(code)
+        _messages[code] = message
+    return message
+
+
+def get_last_error(context='', pid=None):
+    """
+    :param context: what failed, e.g. the name of the function
+    :param pid: the PID of the process it failed for
+    :return: a ProcessError of the calling thread's last Windows error; nothing is formatted or printed
+    """
+    return ProcessError(kernel32.GetLastError(), context, pid)
+
+
+def _report(errors, error):
+    if errors is not None:
+        errors.append(error)
+
+
+def group_threads(thread_list):
+    """Groups threads by owner process in one pass.
+
+    :param thread_list: list of thread dicts, as returned by get_threads
+    :return: dict mapping pid to the list of its threads
+    """
+    threads_by_pid = {}
+    for t in thread_list:
+        threads_by_pid.setdefault(t['pid'], []).append(t)
+    return threads_by_pid
+
+
+class Backend(object):
+    """Where the process functions read processes, threads and modules from."""
+
+    poll_interval = 0.05  # seconds between snapshots of the polling wait
+
+    def process_entries(self, errors=None):
+        """
+        :param errors: list to append a ProcessError to for each failure
+        :return: iterable of tuples of name, pid, ppid, priority_base, thread_count of every process
+        """
+        raise NotImplementedError
+
+    def priority_class(self, pid, errors=None):
+        """
+        :return: the priority class of the process, or None if it cannot be read
+        """
+        raise NotImplementedError
+
+    def modules(self, pid, errors=None):
+        """
+        :return: list of module dicts of the process
+        """
+        raise NotImplementedError
+
+    def start_time(self, pid, errors=None):
+        """
+        :return: when the process started, in units of the backend, telling it apart from a later process reusing its
+        PID; None if it cannot be read
+        """
+        raise NotImplementedError
+
+    def threads(self, pid=None, errors=None):
+        """
+        :param pid: the PID of the process whose threads to list, None for all threads
+        :return: list of thread dicts
+        """
+        raise NotImplementedError
+
+    def wait(self, pids, wait_all=False, timeout=None, errors=None):
+        """Waits for processes to exit. This one polls snapshots; backends override it to block on the processes.
+
+        :param pids: list of PIDs
+        :param wait_all: wait for all of them to exit, instead of any
+        :param timeout: seconds to wait at most, None to wait indefinitely
+        :param errors: list to append a ProcessError to for each process that cannot be waited for
+        :return: list of the PIDs found exited, empty if the wait timed out
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            running = set(entry[1] for entry in self.process_entries(errors))
+            exited = [pid for pid in pids if pid not in running]
+            if exited and (not wait_all or len(exited) == len(pids)):
+                return exited
+            if deadline is not None and time.time() >= deadline:
+                return []
+            time.sleep(self.poll_interval if deadline is None else
+                       max(min(self.poll_interval, deadline - time.time()), 0))
+
+
+class ListBackend(Backend):
+    """A fake process list held in memory, for running and testing process users off Windows."""
+
+    def __init__(self, entries=()):
+        """
+        :param entries: list of tuples of name, pid, ppid, priority_base, thread_count
+        """
+        self.entries = []
+        self.modules_by_pid = {}  # pid -> list of module dicts, which tests may fill in
+        self._changed = threading.Condition()
+        self._start_times = {}
+        self._clock = 0
+        for entry in entries:
+            self.start(*entry)
+
+    def start(self, name, pid, ppid=0, priority_base=8, thread_count=1):
+        with self._changed:
+            self.entries.append((name, pid, ppid, priority_base, thread_count))
+            self._clock += 1
+            self._start_times[pid] = self._clock
+            self._changed.notify_all()
+
+    def exit(self, pid):
+        with self._changed:
+            self.entries = [entry for entry in self.entries if entry[1] != pid]
+            self.modules_by_pid.pop(pid, None)
+            self._changed.notify_all()
+
+    def process_entries(self, errors=None):
+        return list(self.entries)
+
+    def priority_class(self, pid, errors=None):
+        return None
+
+    def modules(self, pid, errors=None):
+        return list(self.modules_by_pid.get(pid, []))
+
+    def start_time(self, pid, errors=None):
+        return self._start_times.get(pid) if any(entry[1] == pid for entry in self.entries) else None
+
+    def threads(self, pid=None, errors=None):
         return []
 
-    pe32 = PROCESSENTRY32()
-    pe32.dwSize = sizeof(PROCESSENTRY32)
-
-    process_list = []
-
-    def _get_process_info(pe32):
-        dwPriorityClass = None
-
-        if pe32.th32ProcessID != 0:
-            hProcess = kernel32.OpenProcess(PROCESS_ALL_ACCESS, False, pe32.th32ProcessID)
-
-            if not hProcess:
-                get_last_error('OpenProcess, pid %s' % pe32.th32ProcessID)
+    def wait(self, pids, wait_all=False, timeout=None, errors=None):
+        deadline = None if timeout is None else time.time() + timeout
+        with self._changed:
+            while True:
+                running = set(entry[1] for entry in self.entries)
+                exited = [pid for pid in pids if pid not in running]
+                if exited and (not wait_all or len(exited) == len(pids)):
+                    return exited
+                if deadline is not None and time.time() >= deadline:
+                    return []
+                self._changed.wait(None if deadline is None else deadline - time.time())
+
+
+_backend = None
+
+
+def get_backend():
+    """
+    :return: the Backend in use: Toolhelp snapshots on Windows, /proc on Linux, unless set_backend was called
+    """
+    global _backend
+    if _backend is None:
+        if os.name == 'nt':
+            _backend = ToolhelpBackend()
+        elif os.path.isdir('/proc'):
+            from .procfs import ProcfsBackend
+            _backend = ProcfsBackend()
+        else:
+            raise RuntimeError('no process backend on this platform, use process.set_backend')
+    return _backend
+
+
+def set_backend(backend):
+    """
+    :param backend: a Backend; None to restore the default
+    """
+    global _backend
+    _backend = backend
+
+
+def get_priority_class(pid, errors=None):
+    """
+    :param pid: the PID of the process
+    :param errors: list to append a ProcessError to if the process cannot be opened
+    :return: the priority class of the process, or None if it cannot be opened
+    """
+    return get_backend().priority_class(pid, errors)
+
+
+def get_process_modules(pid, errors=None):
+    return get_backend().modules(pid, errors)
+
+
+def get_threads(pid=None, errors=None):
+    return get_backend().threads(pid, errors)
+
+
+def get_start_time(pid, errors=None):
+    """
+    :param pid: the PID of the process
+    :return: the creation time of the process (a FILETIME on Windows, clock ticks after boot on Linux), which tells it
+    apart from a later process reusing its PID; None if it cannot be opened
+    """
+    return get_backend().start_time(pid, errors)
+
+
+class Process(dict):
+    """A process entry of a snapshot.
+    'name', 'pid', 'ppid', 'priority_base' and 'thread_count' come with the snapshot;
+    'priority_class', 'modules' and 'threads' take further syscalls, and are looked up on first access.
+    Note dict.get and iteration only see the fields looked up so far, and errors of lookups on access are dropped.
+    """
+
+    def __missing__(self, key):
+        loader = _lazy_fields.get(key)
+        if loader is None:
+            raise KeyError(key)
+        value = self[key] = loader(self['pid'])
+        return value
+
+
+_lazy_fields = {
+    'priority_class': get_priority_class,
+    'modules': get_process_modules,
+    'threads': get_threads
+}
+
+LAZY_FIELDS = tuple(_lazy_fields)
+
+# The lazy fields looked up one process at a time, and their values when the lookup fails
+DETAIL_FIELDS = ('priority_class', 'modules')
+_empty_fields = {
+    'priority_class': lambda: None,
+    'modules': list,
+    'threads': list
+}
+
+
+def iter_processes(fields=(), errors=None):
+    """Streams the processes of one snapshot.
+
+    :param fields: the lazy fields ('priority_class', 'modules', 'threads') to look up before yielding each process;
+    threads are then indexed from a single thread snapshot
+    :param errors: list to append a ProcessError to for each failed lookup, as the processes are yielded
+    :return: generator of Process
+    """
+    backend = get_backend()
+    threads_by_pid = group_threads(backend.threads(None, errors)) if 'threads' in fields else None  # by pid
+
+    for name, pid, ppid, priority_base, thread_count in backend.process_entries(errors):
+        process = Process(name=name, pid=pid, ppid=ppid, priority_base=priority_base, thread_count=thread_count)
+        if threads_by_pid is not None:
+            process['threads'] = threads_by_pid.get(pid, [])
+        for field in fields:
+            if field not in process:
+                process[field] = _lazy_fields[field](pid, errors)
+        yield process
+
+
+def collect_details(processes, fields=DETAIL_FIELDS, workers=8, timeout=None, errors=None, deadline=None):
+    """Looks up lazy fields of many processes on a pool of threads.
+    Module snapshots of different processes are independent and mostly wait on the kernel, so they overlap well.
+
+    :param processes: list of Process, filled in place
+    :param fields: the lazy fields to look up
+    :param workers: number of threads
+    :param timeout: seconds the lookup of each process may take from when it starts, None for no limit; a lookup
+    timing out is left to finish in the background, and another thread takes over the processes left
+    :param errors: list to append the ProcessErrors of each process to, in the order of processes; a process whose
+    lookup timed out, raised or never started gets one, and empty values for its fields ('priority_class' None,
+    'modules' [])
+    :param deadline: seconds the whole call may take, None for no limit; lookups not started by then are reported
+    with ERROR_CANCELLED, those still running with WAIT_TIMEOUT
+    :return: processes
+    """
+    pids = [p['pid'] for p in processes]
+    results = [None] * len(pids)  # tuples of values, errors of the lookups done
+    running = {}  # index -> time.time() the lookup started
+    abandoned = set()  # indexes of the lookups past their timeout, whose threads have been replaced
+    state = {'next': 0, 'stop': False}
+    changed = threading.Condition()
+
+    def work():
+        while True:
+            with changed:
+                i = state['next']
+                if state['stop'] or i >= len(pids):
+                    return
+                state['next'] += 1
+                running[i] = time.time()
+                changed.notify_all()  # its timeout starts now
+            try:
+                errs = []
+                res = [_lazy_fields[field](pids[i], errs) for field in fields], errs
+            except Exception as e:
+                res = None, [ProcessError(getattr(e, 'winerror', None), '%s: %s' % (type(e).__name__, e), pids[i])]
+            with changed:
+                results[i] = res
+                del running[i]
+                changed.notify_all()
+                if i in abandoned:
+                    return  # replaced
+
+    def spawn():
+        thread = threading.Thread(target=work)
+        thread.daemon = True  # a hung lookup does not hold up the interpreter's exit
+        thread.start()
+
+    end = None if deadline is None else time.time() + deadline
+    with changed:
+        for _ in range(min(workers, len(pids))):
+            spawn()
+        while True:
+            now = time.time()
+            if timeout is not None:
+                for i, started in list(running.items()):
+                    if i not in abandoned and now - started >= timeout:
+                        abandoned.add(i)
+                        spawn()
+            if state['next'] >= len(pids) and all(i in abandoned for i in running) or end is not None and now >= end:
+                break
+            wake = [started + timeout for i, started in running.items() if i not in abandoned] \
+                if timeout is not None else []
+            if end is not None:
+                wake.append(end)
+            changed.wait(max(min(wake) - now, 0.001) if wake else None)
+        state['stop'] = True
+        results = list(results)
+        started = set(running) | set(i for i, res in enumerate(results) if res is not None)
+
+    for i, p in enumerate(processes):
+        values, errs = results[i] or (None, [])
+        if results[i] is None:
+            if i in abandoned:
+                errs = [ProcessError(WAIT_TIMEOUT, 'timed out after %s s' % timeout, p['pid'])]
+            elif i in started:
+                errs = [ProcessError(WAIT_TIMEOUT, 'still running at the deadline of %s s' % deadline, p['pid'])]
             else:
-                dwPriorityClass = kernel32.GetPriorityClass(hProcess) or dwPriorityClass
-
-                enable_debug_privilege(hProcess)
-
-                kernel32.CloseHandle(hProcess)
-
-
-        process_list.append({
-            'name': pe32.szExeFile,
-            'pid': pe32.th32ProcessID,
-            'ppid': pe32.th32ParentProcessID,
-            'priority_base': pe32.pcPriClassBase,
-            'priority_class': dwPriorityClass,
-            'modules': get_process_modules(pe32.th32ProcessID),
-            'thread_count': pe32.cntThreads,
-            'threads': [t for t in thread_list if t['pid'] == pe32.th32ProcessID]
-        })
-
-    if kernel32.Process32First(hProcessSnap, pointer(pe32)):
-        _get_process_info(pe32)
-
-        while kernel32.Process32Next(hProcessSnap, pointer(pe32)):
-            _get_process_info(pe32)
-
-    kernel32.CloseHandle(hProcessSnap)
-    return process_list
-
-
-def get_process_modules(pid):
-    hModuleSnap = kernel32.CreateToolhelp32Snapshot(TH32CS_SNAPMODULE, pid)
-    if hModuleSnap == INVALID_HANDLE_VALUE:
-        get_last_error('CreateToolhelp32Snapshot, TH32CS_SNAPMODULE, pid %s' % pid)
-        return []
-
-    me32 = MODULEENTRY32()
-    me32.dwSize = sizeof(MODULEENTRY32)
-
-    module_list = []
+                errs = [ProcessError(ERROR_CANCELLED, 'not started by the deadline of %s s' % deadline, p['pid'])]
+        if values is None:
+            values = [_empty_fields[field]() for field in fields]
+        if errors is not None:
+            errors.extend(errs)
+        p.update(zip(fields, values))
+    return processes
+
+
+def get_process_list(fields=LAZY_FIELDS, workers=0, timeout=None, errors=None, deadline=None):
+    """
+    :param fields: the lazy fields to look up eagerly, all of them by default; e.g. () lists names and pids
+    from a single snapshot, leaving the others to be looked up on access
+    :param workers: if not 0, look up 'priority_class' and 'modules' on this many threads, see collect_details
+    :param timeout: with workers, seconds the lookup of each process may take, see collect_details
+    :param errors: list to append a ProcessError to for each failed lookup, e.g. the processes that cannot be opened
+    :param deadline: with workers, seconds the lookups may take in all, see collect_details
+    :return: list of Process, in snapshot order
+    """
+    if not workers:
+        return list(iter_processes(fields, errors))
+    processes = list(iter_processes([field for field in fields if field not in DETAIL_FIELDS], errors))
+    return collect_details(processes, [field for field in fields if field in DETAIL_FIELDS], workers, timeout,
+                           errors, deadline)
+
+
+def get_process_table(errors=None):
+    """Reads a snapshot straight into columns, without a dict per process.
+
+    :param errors: list to append a ProcessError to if the snapshot fails
+    :return: a proctable.ProcessTable
+    """
+    table = ProcessTable()
+    for name, pid, ppid, priority_base, thread_count in get_backend().process_entries(errors):
+        table.append(name, pid, ppid, thread_count, priority_base)
+    return table
+
+
+def _name_key(name):
+    # Snapshot names are bytes; process names are compared case-insensitively, as by Windows
+    if not isinstance(name, bytes):
+        name = name.encode('mbcs' if os.name == 'nt' else 'utf-8')
+    return name.lower()
+
+
+class ProcessIndex(object):
+    """PIDs by name from one snapshot, answering many existence checks for the cost of a single snapshot."""
+
+    def __init__(self, entries):
+        """
+        :param entries: iterable of tuples of name, pid, ..., as returned by Backend.process_entries
+        """
+        self._by_name = {}
+        self._pids = set()
+        for entry in entries:
+            self._by_name.setdefault(_name_key(entry[0]), []).append(entry[1])
+            self._pids.add(entry[1])
+
+    def pids(self, process):
+        """
+        :param process: the name or PID of a process, e.g. "notepad.exe" or 3647
+        :return: list of the PIDs of the processes of that name, or of that PID, in snapshot order
+        """
+        if isinstance(process, numbers.Integral):
+            return [process] if process in self._pids else []
+        return list(self._by_name.get(_name_key(process), []))
+
+    def exists(self, process):
+        """Like autoit.process_exists.
+
+        :param process: the name or PID of a process
+        :return: the PID of the process, the highest one if several have that name, or 0 if it does not exist
+        """
+        return max(self.pids(process) or [0])
+
+    def __contains__(self, process):
+        return bool(self.pids(process))
+
+
+def get_process_index(errors=None):
+    """
+    :return: a ProcessIndex of a new snapshot
+    """
+    return ProcessIndex(get_backend().process_entries(errors))
+
+
+def wait_any(processes, timeout=0, errors=None):
+    """Pauses script execution until one of several processes closes, blocking on the processes instead of polling.
+    A name stands for all the processes of that name when the function is called, and closes once they have all
+    exited; processes of that name started afterwards are not waited for.
+
+    :param processes: list of names or PIDs of processes, e.g. ["notepad.exe", 3647]
+    :param timeout: Specifies how long to wait, in seconds (default 0 is to wait indefinitely)
+    :param errors: list to append a ProcessError to for each process that cannot be waited for
+    :return: the first of processes found closed, or None if the wait timed out
+    """
+    backend = get_backend()
+    deadline = time.time() + timeout if timeout else None
+    index = ProcessIndex(backend.process_entries(errors))
+    targets = [(process, index.pids(process)) for process in processes]
+    while True:
+        for process, pids in targets:
+            if not pids:
+                return process
+        exited = backend.wait([pid for _, pids in targets for pid in pids], False,
+                              None if deadline is None else max(deadline - time.time(), 0), errors)
+        if not exited:
+            return None
+        exited = set(exited)
+        targets = [(process, [pid for pid in pids if pid not in exited]) for process, pids in targets]
+
+
+def wait_all(processes, timeout=0, errors=None):
+    """Pauses script execution until several processes close, blocking on the processes instead of polling.
+    Names stand for the processes of that name when the function is called, see wait_any.
+
+    :param processes: list of names or PIDs of processes, e.g. ["notepad.exe", 3647]
+    :param timeout: Specifies how long to wait, in seconds (default 0 is to wait indefinitely)
+    :param errors: list to append a ProcessError to for each process that cannot be waited for
+    :return: True if all of them closed, False if the wait timed out
+    """
+    backend = get_backend()
+    index = ProcessIndex(backend.process_entries(errors))
+    pids = sorted(set(pid for process in processes for pid in index.pids(process)))
+    return not pids or bool(backend.wait(pids, True, timeout or None, errors))
+
+
+class ToolhelpBackend(Backend):
+    """Toolhelp32 snapshots of kernel32. SeDebugPrivilege is enabled once, on creation, to open protected processes."""
+
+    def __init__(self):
+        debug_privilege.enable()
+
+    def process_entries(self, errors=None):
+        hProcessSnap = kernel32.CreateToolhelp32Snapshot(TH32CS_SNAPPROCESS, 0)
+        if hProcessSnap == INVALID_HANDLE_VALUE:
+            _report(errors, get_last_error('CreateToolhelp32Snapshot'))
+            return
+
+        pe32 = PROCESSENTRY32()
+        pe32.dwSize = sizeof(PROCESSENTRY32)
+
+        try:
+            more = kernel32.Process32First(hProcessSnap, pointer(pe32))
+            while more:
+                yield (pe32.szExeFile, pe32.th32ProcessID, pe32.th32ParentProcessID, pe32.pcPriClassBase,
+                       pe32.cntThreads)
+                more = kernel32.Process32Next(hProcessSnap, pointer(pe32))
+        finally:
+            kernel32.CloseHandle(hProcessSnap)
+
+    def priority_class(self, pid, errors=None):
+        if pid == 0:
+            return None
+
+        hProcess = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not hProcess:
+            _report(errors, get_last_error('OpenProcess', pid))
+            return None
+
+        dwPriorityClass = kernel32.GetPriorityClass(hProcess) or None
+        kernel32.CloseHandle(hProcess)
+        return dwPriorityClass
+
+    def modules(self, pid, errors=None):
+        hModuleSnap = kernel32.CreateToolhelp32Snapshot(TH32CS_SNAPMODULE, pid)
+        if hModuleSnap == INVALID_HANDLE_VALUE:
+            _report(errors, get_last_error('CreateToolhelp32Snapshot, TH32CS_SNAPMODULE', pid))
+            return []
+
+        me32 = MODULEENTRY32()
+        me32.dwSize = sizeof(MODULEENTRY32)
+
+        module_list = []
+
+        def _get_module_info(me32):
+            module_list.append({
+                'name': me32.szModule,
+                'path': me32.szExePath,
+                'pid': me32.th32ProcessID,
+                'base_address': me32.modBaseAddr,
+                'base_size': me32.modBaseSize
+            })
 
-    def _get_module_info(me32):
-        module_list.append({
-            'name': me32.szModule,
-            'path': me32.szExePath,
-            'pid': me32.th32ProcessID,
-            'base_address': me32.modBaseAddr,
-            'base_size': me32.modBaseSize
-        })
+        if kernel32.Module32First(hModuleSnap, pointer(me32)):
+            _get_module_info(me32)
 
-    if kernel32.Module32First(hModuleSnap, pointer(me32)):
-        _get_module_info(me32)
+            while kernel32.Module32Next(hModuleSnap, pointer(me32)):
+                _get_module_info(me32)
 
-        while kernel32.Module32Next(hModuleSnap, pointer(me32)):
-            _get_module_info(me32)
+        kernel32.CloseHandle(hModuleSnap)
+        return module_list
 
-    kernel32.CloseHandle(hModuleSnap)
-    return module_list
+    def start_time(self, pid, errors=None):
+        if pid == 0:
+            return None
 
+        hProcess = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not hProcess:
+            _report(errors, get_last_error('OpenProcess', pid))
+            return None
 
-def get_threads(pid=None):
-    hThreadSnap = kernel32.CreateToolhelp32Snapshot(TH32CS_SNAPTHREAD, 0)
-    if hThreadSnap == INVALID_HANDLE_VALUE:
-        get_last_error('CreateToolhelp32Snapshot, TH32CS_SNAPTHREAD')
-        return []
+        creation, exit, kernel, user = c_ulonglong(), c_ulonglong(), c_ulonglong(), c_ulonglong()
+        ok = kernel32.GetProcessTimes(hProcess, pointer(creation), pointer(exit), pointer(kernel), pointer(user))
+        if not ok:
+            _report(errors, get_last_error('GetProcessTimes', pid))
+        kernel32.CloseHandle(hProcess)
+        return creation.value if ok else None
 
-    te32 = THREADENTRY32()
-    te32.dwSize = sizeof(THREADENTRY32)
+    def threads(self, pid=None, errors=None):
+        hThreadSnap = kernel32.CreateToolhelp32Snapshot(TH32CS_SNAPTHREAD, 0)
+        if hThreadSnap == INVALID_HANDLE_VALUE:
+            _report(errors, get_last_error('CreateToolhelp32Snapshot, TH32CS_SNAPTHREAD', pid))
+            return []
 
-    thread_list = []
+        te32 = THREADENTRY32()
+        te32.dwSize = sizeof(THREADENTRY32)
 
-    def _get_thread_info(te32):
-        if pid is None or te32.th32OwnerProcessID == pid:
-            thread_list.append({
-                'tid': te32.th32ThreadID,
-                'pid': te32.th32OwnerProcessID,
-                'base_priority': te32.tpBasePri
-            })
+        thread_list = []
 
-    if kernel32.Thread32First(hThreadSnap, pointer(te32)):
-        _get_thread_info(te32)
+        def _get_thread_info(te32):
+            if pid is None or te32.th32OwnerProcessID == pid:
+                thread_list.append({
+                    'tid': te32.th32ThreadID,
+                    'pid': te32.th32OwnerProcessID,
+                    'base_priority': te32.tpBasePri
+                })
 
-        while kernel32.Thread32Next(hThreadSnap, pointer(te32)):
+        if kernel32.Thread32First(hThreadSnap, pointer(te32)):
             _get_thread_info(te32)
 
-    kernel32.CloseHandle(hThreadSnap)
-    return thread_list
+            while kernel32.Thread32Next(hThreadSnap, pointer(te32)):
+                _get_thread_info(te32)
+
+        kernel32.CloseHandle(hThreadSnap)
+        return thread_list
+
+    def wait(self, pids, wait_all=False, timeout=None, errors=None):
+        # WaitForMultipleObjects on the process handles, MAXIMUM_WAIT_OBJECTS at a time; the processes that cannot be
+        # opened, e.g. for lack of access, are watched through snapshots as Backend.wait does
+        handles, waited, exited, polled = [], [], [], []
+        for pid in pids:
+            hProcess = kernel32.OpenProcess(SYNCHRONIZE, False, pid)
+            if hProcess:
+                handles.append(hProcess)
+                waited.append(pid)
+                continue
+            error = get_last_error('OpenProcess, SYNCHRONIZE', pid)
+            if error.code == ERROR_INVALID_PARAMETER:
+                exited.append(pid)  # no such process any more
+            else:
+                _report(errors, error)
+                polled.append(pid)
+
+        deadline = None if timeout is None else time.time() + timeout
+
+        def wait_chunk(start, wait_all, ms):
+            chunk = handles[start:start + MAXIMUM_WAIT_OBJECTS]
+            res = kernel32.WaitForMultipleObjects(len(chunk), (c_void_p * len(chunk))(*chunk), wait_all, ms)
+            if res == WAIT_FAILED:
+                _report(errors, get_last_error('WaitForMultipleObjects'))
+            return res
+
+        def remaining_ms():
+            return INFINITE if deadline is None else max(int((deadline - time.time()) * 1000), 0)
+
+        def remaining():
+            return None if deadline is None else max(deadline - time.time(), 0)
+
+        starts = range(0, len(handles), MAXIMUM_WAIT_OBJECTS)
+        try:
+            if wait_all:
+                for start in starts:
+                    if wait_chunk(start, True, remaining_ms()) in (WAIT_TIMEOUT, WAIT_FAILED):
+                        return []
+                if polled and not Backend.wait(self, polled, True, remaining(), errors):
+                    return []
+                return exited + waited + polled
+
+            # Past MAXIMUM_WAIT_OBJECTS handles, cycle through the chunks with short waits; with processes to poll,
+            # wait on the handles for a poll interval at most between snapshots
+            slice_ms = 10 if len(starts) > 1 else int(self.poll_interval * 1000) if polled else None
+            while (handles or polled) and not exited:
+                for start in starts:
+                    ms = remaining_ms() if slice_ms is None else min(remaining_ms(), slice_ms)
+                    res = wait_chunk(start, False, ms)
+                    if res == WAIT_FAILED:
+                        return []
+                    if res != WAIT_TIMEOUT:
+                        exited.append(waited[start + res - WAIT_OBJECT_0])
+                        break
+                else:
+                    if polled:
+                        if not handles:
+                            time.sleep(self.poll_interval if deadline is None else
+                                       min(self.poll_interval, remaining()))
+                        running = set(entry[1] for entry in self.process_entries(errors))
+                        exited = [pid for pid in polled if pid not in running]
+                    if remaining_ms() == 0:
+                        break
+            return exited
+        finally:
+            for hProcess in handles:
+                kernel32.CloseHandle(hProcess)
 
 
 ANYSIZE_ARRAY = 1
 TOKEN_ADJUST_PRIVILEGES = 0x0020
 TOKEN_QUERY = 0x0008
-SE_DEBUG_NAME = 'SeDebugPrivilege'
+SE_DEBUG_NAME = b'SeDebugPrivilege'
 SE_PRIVILEGE_ENABLED = 2
+ERROR_NOT_ALL_ASSIGNED = 1300
 
 
 class LUID(Structure):
@@ -227,37 +794,88 @@ class TOKEN_PRIVILEGES(Structure):
     ]
 
 
-advapi32.LookupPrivilegeValueA.argtypes = [c_char_p, c_char_p, POINTER(LUID)]
-advapi32.AdjustTokenPrivileges.argtypes = [c_void_p, c_bool, POINTER(TOKEN_PRIVILEGES),
-                                           c_ulong, POINTER(TOKEN_PRIVILEGES), POINTER(c_ulong)]
-
-
-def enable_debug_privilege(process_handle):
-    hToken = c_void_p()
-    if not kernel32.OpenProcessToken(process_handle,
-                                     TOKEN_ADJUST_PRIVILEGES | TOKEN_ADJUST_PRIVILEGES,
-                                     pointer(hToken)):
-        get_last_error('OpenProcessToken')
-        return False
-
-    luid = LUID()
-    if not advapi32.LookupPrivilegeValueA(None, SE_DEBUG_NAME, pointer(luid)):
-        get_last_error('LookupPrivilegeValueA')
-        kernel32.CloseHandle(hToken)
-        return False
-
-    tp = TOKEN_PRIVILEGES()
-    tp.PrivilegeCount = 1
-    tp.Privileges[0].Luid = luid
-    tp.Privileges[0].Attributes = SE_PRIVILEGE_ENABLED
-
-    if not advapi32.AdjustTokenPrivileges(hToken, False, pointer(tp), sizeof(TOKEN_PRIVILEGES), None, None):
-        get_last_error('AdjustTokenPrivileges')
-        kernel32.CloseHandle(hToken)
-        return False
-
-    kernel32.CloseHandle(hToken)
-    return True
+if os.name == 'nt':
+    kernel32.GetCurrentProcess.restype = c_void_p
+    advapi32.OpenProcessToken.argtypes = [c_void_p, c_ulong, POINTER(c_void_p)]
+    advapi32.LookupPrivilegeValueA.argtypes = [c_char_p, c_char_p, POINTER(LUID)]
+    advapi32.AdjustTokenPrivileges.argtypes = [c_void_p, c_bool, POINTER(TOKEN_PRIVILEGES),
+                                               c_ulong, POINTER(TOKEN_PRIVILEGES), POINTER(c_ulong)]
+
+
+class DebugPrivilege(object):
+    """SeDebugPrivilege of the current process's token, enabled at most once.
+    The privilege stays enabled for the life of the process, so the outcome of the first attempt is kept.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._luid = None
+        self.active = None  # None until enable() is called, then whether the privilege is enabled
+        self.error = None  # the ProcessError of the failed attempt
+
+    def luid(self):
+        """
+        :return: the LUID of SeDebugPrivilege, looked up once; None if the lookup fails
+        """
+        if self._luid is None:
+            luid = LUID()
+            if not advapi32.LookupPrivilegeValueA(None, SE_DEBUG_NAME, pointer(luid)):
+                self.error = get_last_error('LookupPrivilegeValueA')
+                return None
+            self._luid = luid
+        return self._luid
+
+    def enable(self):
+        """
+        :return: whether the privilege is enabled; only the first call adjusts the token, and a failure is kept in
+            error rather than raised
+        """
+        with self._lock:
+            if self.active is None:
+                try:
+                    self.active = self._adjust()
+                except Exception as e:
+                    self.error = ProcessError(getattr(e, 'winerror', None), '%s: %s' % (type(e).__name__, e), None)
+                    self.active = False
+            return self.active
+
+    def _adjust(self):
+        hToken = c_void_p()
+        if not advapi32.OpenProcessToken(kernel32.GetCurrentProcess(), TOKEN_ADJUST_PRIVILEGES | TOKEN_QUERY,
+                                         pointer(hToken)):
+            self.error = get_last_error('OpenProcessToken')
+            return False
+
+        try:
+            luid = self.luid()
+            if luid is None:
+                return False
+
+            tp = TOKEN_PRIVILEGES()
+            tp.PrivilegeCount = 1
+            tp.Privileges[0].Luid = luid
+            tp.Privileges[0].Attributes = SE_PRIVILEGE_ENABLED
+
+            # Succeeds without enabling anything if the token lacks the privilege, which GetLastError then tells
+            if not advapi32.AdjustTokenPrivileges(hToken, False, pointer(tp), sizeof(TOKEN_PRIVILEGES), None, None) \
+                    or kernel32.GetLastError() == ERROR_NOT_ALL_ASSIGNED:
+                self.error = get_last_error('AdjustTokenPrivileges')
+                return False
+            return True
+        finally:
+            kernel32.CloseHandle(hToken)
+
+
+debug_privilege = DebugPrivilege()
+
+
+def enable_debug_privilege(process_handle=None):
+    """Enables SeDebugPrivilege for the current process, see DebugPrivilege.
+
+    :param process_handle: ignored; the privilege only matters in the token of the process opening others
+    :return: whether the privilege is enabled
+    """
+    return debug_privilege.enable()
 
 
 if __name__ == '__main__':
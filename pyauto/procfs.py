@@ -0,0 +1,156 @@
+"""Process snapshots read from Linux's /proc, so the process functions also run off Windows.
+
+Fields map onto the Toolhelp ones where Linux has a counterpart: priority_base is the kernel priority of the process,
+priority_class its nice value, and modules are the files mapped into its address space. Error codes are errnos.
+"""
+import errno
+import os
+import select
+import time
+
+from .process import Backend, ProcessError
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _stat(path):
+    # The fields of a /proc stat file; comm, the 2nd field, is in parentheses and may itself contain spaces or ')'
+    data = _read(path)
+    left, right = data.index(b'('), data.rindex(b')')
+    return [data[:left].strip(), data[left + 1:right]] + data[right + 2:].split()
+
+
+def _error(e, path, pid):
+    return ProcessError(e.errno, 'read %s' % path, pid)
+
+
+def _pids(root):
+    return sorted(int(name) for name in os.listdir(root) if name.isdigit())
+
+
+class ProcfsBackend(Backend):
+    """Reads /proc/<pid>/stat, /proc/<pid>/task and /proc/<pid>/maps.
+    Processes and threads exiting while being listed are skipped without an error.
+    """
+
+    def __init__(self, root='/proc'):
+        """
+        :param root: mount point of procfs
+        """
+        self.root = root
+
+    def process_entries(self, errors=None):
+        for pid in _pids(self.root):
+            try:
+                stat = _stat(os.path.join(self.root, str(pid), 'stat'))
+            except (IOError, OSError):
+                continue
+            if stat[2] == b'Z':
+                continue  # exited, only waiting for its parent to collect its exit status
+            yield stat[1], pid, int(stat[3]), int(stat[17]), int(stat[19])
+
+    def priority_class(self, pid, errors=None):
+        path = os.path.join(self.root, str(pid), 'stat')
+        try:
+            return int(_stat(path)[18])
+        except (IOError, OSError) as e:
+            if errors is not None:
+                errors.append(_error(e, path, pid))
+            return None
+
+    def start_time(self, pid, errors=None):
+        path = os.path.join(self.root, str(pid), 'stat')
+        try:
+            return int(_stat(path)[21])
+        except (IOError, OSError) as e:
+            if errors is not None:
+                errors.append(_error(e, path, pid))
+            return None
+
+    def modules(self, pid, errors=None):
+        path = os.path.join(self.root, str(pid), 'maps')
+        try:
+            maps = _read(path)
+        except (IOError, OSError) as e:
+            if errors is not None:
+                errors.append(_error(e, path, pid))
+            return []
+
+        module_list = []
+        by_path = {}
+        for line in maps.splitlines():
+            fields = line.split(None, 5)
+            if len(fields) < 6 or not fields[5].startswith(b'/'):
+                continue  # anonymous mapping, heap, stack, vdso...
+            path = fields[5]
+            start, end = [int(address, 16) for address in fields[0].split(b'-')]
+            module = by_path.get(path)
+            if module is None:
+                by_path[path] = module = {
+                    'name': os.path.basename(path),
+                    'path': path,
+                    'pid': pid,
+                    'base_address': start,
+                    'base_size': end - start
+                }
+                module_list.append(module)
+            else:
+                module['base_size'] = max(module['base_size'], end - module['base_address'])
+        return module_list
+
+    def threads(self, pid=None, errors=None):
+        pids = _pids(self.root) if pid is None else [pid]
+        thread_list = []
+        for owner in pids:
+            task = os.path.join(self.root, str(owner), 'task')
+            try:
+                tids = _pids(task)
+            except (IOError, OSError):
+                continue
+            for tid in tids:
+                try:
+                    stat = _stat(os.path.join(task, str(tid), 'stat'))
+                except (IOError, OSError):
+                    continue
+                thread_list.append({
+                    'tid': tid,
+                    'pid': owner,
+                    'base_priority': int(stat[17])
+                })
+        return thread_list
+
+    def wait(self, pids, wait_all=False, timeout=None, errors=None):
+        # Polls pidfds, which become readable when their process exits; snapshots are polled where there are none
+        if not hasattr(os, 'pidfd_open'):
+            return Backend.wait(self, pids, wait_all, timeout, errors)
+
+        fds, exited = {}, []
+        for pid in pids:
+            try:
+                fds[os.pidfd_open(pid)] = pid
+            except OSError as e:
+                if e.errno == errno.ESRCH:
+                    exited.append(pid)
+                elif errors is not None:
+                    errors.append(ProcessError(e.errno, 'pidfd_open', pid))
+
+        deadline = None if timeout is None else time.time() + timeout
+        try:
+            poller = select.poll()
+            for fd in fds:
+                poller.register(fd, select.POLLIN)
+            while fds and (wait_all or not exited):
+                events = poller.poll(None if deadline is None else max(int((deadline - time.time()) * 1000), 0))
+                if not events:
+                    return []
+                for fd, _ in events:
+                    poller.unregister(fd)
+                    os.close(fd)
+                    exited.append(fds.pop(fd))
+            return exited
+        finally:
+            for fd in fds:
+                os.close(fd)
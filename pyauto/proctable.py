@@ -0,0 +1,74 @@
+"""A column-wise process table, for polling snapshots without building a dict per process."""
+from array import array
+
+
+# Executable names shared by all tables, so each distinct name is stored once however many snapshots hold it
+_names = {}
+
+
+class ProcessTable(object):
+    """Processes stored as parallel columns, with an index from pid to row."""
+
+    def __init__(self):
+        self.names = []
+        self.pids = array('L')
+        self.ppids = array('L')
+        self.thread_counts = array('L')
+        self.priority_bases = array('l')
+        self._rows = {}
+
+    @classmethod
+    def from_processes(cls, processes):
+        """
+        :param processes: iterable of process dicts, e.g. as returned by process.get_process_list
+        :return: a ProcessTable
+        """
+        table = cls()
+        for p in processes:
+            table.append(p['name'], p['pid'], p['ppid'], p['thread_count'], p['priority_base'])
+        return table
+
+    def append(self, name, pid, ppid, thread_count, priority_base):
+        self._rows[pid] = len(self.pids)
+        self.names.append(_names.setdefault(name, name))
+        self.pids.append(pid)
+        self.ppids.append(ppid)
+        self.thread_counts.append(thread_count)
+        self.priority_bases.append(priority_base)
+
+    def row(self, pid):
+        """
+        :return: the row index of the process, or None if it is not in the table
+        """
+        return self._rows.get(pid)
+
+    def get(self, pid):
+        """
+        :return: the process as a dict, or None if it is not in the table
+        """
+        i = self._rows.get(pid)
+        return None if i is None else self._dict(i)
+
+    def _dict(self, i):
+        return {
+            'name': self.names[i],
+            'pid': self.pids[i],
+            'ppid': self.ppids[i],
+            'thread_count': self.thread_counts[i],
+            'priority_base': self.priority_bases[i]
+        }
+
+    def to_list(self):
+        """
+        :return: list of process dicts, in the format of process.get_process_list(fields=())
+        """
+        return [self._dict(i) for i in range(len(self.pids))]
+
+    def __len__(self):
+        return len(self.pids)
+
+    def __contains__(self, pid):
+        return pid in self._rows
+
+    def __iter__(self):
+        return iter(self.pids)
@@ -0,0 +1,65 @@
+"""Incremental diffing of process snapshots, for supervisors polling for crashes and restarts."""
+from collections import namedtuple
+
+
+class ProcessEvent(namedtuple('ProcessEvent', ['kind', 'process', 'previous'])):
+    """A change between two snapshots.
+    kind is 'started', 'exited' or 'changed'; process is the entry of the new snapshot (of the old one for 'exited');
+    previous is the entry of the old snapshot for 'changed', None otherwise.
+    """
+    __slots__ = ()
+
+
+def _default_snapshot():
+    from . import process
+    return process.get_process_list(fields=())
+
+
+def _default_identity(p):
+    from . import process
+    start_time = process.get_start_time(p['pid'])
+    return (p['name'], p['ppid']) if start_time is None else start_time
+
+
+class ProcessWatcher(object):
+    """Keeps the previous snapshot keyed by pid and identity, and reports only what differs in the next one."""
+
+    def __init__(self, snapshot=None, identity=None, fields=('thread_count', 'priority_base'), modules=None):
+        """
+        :param snapshot: function returning a list of process dicts; process.get_process_list(fields=()) by default
+        :param identity: function of a process dict returning what tells it apart from a later process reusing its
+        pid; its creation time by default (see process.get_start_time), or its name and ppid if that cannot be read
+        :param fields: fields compared to report a process as 'changed'
+        :param modules: function of a pid returning the process's modules, e.g. process.get_process_modules.
+        If given, each process gets a 'modules' entry, looked up once when it starts and carried over afterwards
+        """
+        self._snapshot = snapshot or _default_snapshot
+        self._identity = identity or _default_identity
+        self._fields = fields
+        self._modules = modules
+        self.processes = {}  # (pid, identity) -> process dict of the latest snapshot
+
+    def poll(self):
+        """Takes a snapshot and diffs it against the previous one. The first poll reports every process as started.
+
+        :return: list of ProcessEvent, exits first
+        """
+        previous, current = self.processes, {}
+        started, changed = [], []
+        for p in self._snapshot():
+            key = p['pid'], self._identity(p)
+            current[key] = p
+            old = previous.get(key)
+            if old is None:
+                if self._modules is not None:
+                    p['modules'] = self._modules(p['pid'])
+                started.append(ProcessEvent('started', p, None))
+                continue
+            if self._modules is not None:
+                p['modules'] = old['modules']
+            if any(p[f] != old[f] for f in self._fields):
+                changed.append(ProcessEvent('changed', p, old))
+
+        exited = [ProcessEvent('exited', p, None) for key, p in previous.items() if key not in current]
+        self.processes = current
+        return exited + started + changed
@@ -0,0 +1,169 @@
+"""Keys sent with SendInput in large batches, bypassing AutoItX and its SendKeyDelay and SendKeyDownDelay.
+
+Keys are compiled by keys.parse into a KeyBuffer of INPUT arrays once, and can then be sent any number of times;
+SendInputBackend.send keeps the buffers of the latest key sequences in ``buffers``.
+"""
+from ctypes import *
+from itertools import groupby
+
+from . import keys
+from .cache import LRUCache
+
+INPUT_MOUSE = 0
+INPUT_KEYBOARD = 1
+ULONG_PTR = c_size_t
+
+
+class MOUSEINPUT(Structure):
+    _fields_ = [
+        ('dx', c_long),
+        ('dy', c_long),
+        ('mouseData', c_ulong),
+        ('dwFlags', c_ulong),
+        ('time', c_ulong),
+        ('dwExtraInfo', ULONG_PTR)
+    ]
+
+
+class KEYBDINPUT(Structure):
+    _fields_ = [
+        ('wVk', c_ushort),
+        ('wScan', c_ushort),
+        ('dwFlags', c_ulong),
+        ('time', c_ulong),
+        ('dwExtraInfo', ULONG_PTR)
+    ]
+
+
+class HARDWAREINPUT(Structure):
+    _fields_ = [
+        ('uMsg', c_ulong),
+        ('wParamL', c_ushort),
+        ('wParamH', c_ushort)
+    ]
+
+
+class _INPUT_UNION(Union):
+    _fields_ = [
+        ('mi', MOUSEINPUT),
+        ('ki', KEYBDINPUT),
+        ('hi', HARDWAREINPUT)
+    ]
+
+
+class INPUT(Structure):
+    _fields_ = [
+        ('type', c_ulong),
+        ('u', _INPUT_UNION)
+    ]
+
+
+_LOCK_FLAGS = keys.LOCK_IF_ON | keys.LOCK_IF_OFF
+
+
+def encode(events):
+    """
+    :param events: list of tuples of vk, scan, flags, as returned by keys.parse
+    :return: ctypes array of INPUT of the events, without their lock conditions
+    """
+    inputs = (INPUT * len(events))()
+    for item, (vk, scan, flags) in zip(inputs, events):
+        item.type = INPUT_KEYBOARD
+        item.u.ki.wVk = vk
+        item.u.ki.wScan = scan
+        item.u.ki.dwFlags = flags & ~_LOCK_FLAGS
+    return inputs
+
+
+def _condition(event):
+    # None for events always sent, or a tuple of the vk of a lock and LOCK_IF_ON or LOCK_IF_OFF
+    return (event[0], event[2] & _LOCK_FLAGS) if event[2] & _LOCK_FLAGS else None
+
+
+class KeyBuffer(object):
+    """Keys compiled into INPUT arrays, to send as many times as needed without parsing them again."""
+
+    def __init__(self, keys_, flag=0):
+        """
+        :param keys_: The sequence of keys to send, in the Send syntax, see autoit.send
+        :param flag: 0 to process special characters like + and ! , 1 to type keys as written
+        """
+        self.keys = keys_
+        self.flag = flag
+        # Runs of events, each a tuple of a condition (see _condition) and an INPUT array
+        self.segments = [(condition, encode(list(events)))
+                         for condition, events in groupby(keys.parse(keys_, flag), _condition)]
+
+    def __len__(self):
+        return sum(len(inputs) for _, inputs in self.segments)
+
+
+buffers = LRUCache(maxsize=256)  # (keys, flag) -> KeyBuffer
+
+
+def get_buffer(keys_, flag=0):
+    """
+    :return: the KeyBuffer of the keys, memoized in ``buffers``
+    :raise keys.SendSyntaxError: if keys_ is malformed
+    """
+    buf = buffers.get((keys_, flag))
+    if buf is None:
+        buf = KeyBuffer(keys_, flag)
+        buffers.put((keys_, flag), buf)
+    return buf
+
+
+class SendInputBackend(object):
+    """A backend for inputseq.InputSequence sending keys with SendInput; mouse actions and options go to the autoit
+    module. Windows only.
+    """
+
+    def __init__(self, batch=1024):
+        """
+        :param batch: maximal number of events of a SendInput call
+        """
+        self._user32 = user32 = windll.user32
+        user32.SendInput.argtypes = [c_uint, POINTER(INPUT), c_int]
+        user32.SendInput.restype = c_uint
+        user32.GetKeyState.argtypes = [c_int]
+        user32.GetKeyState.restype = c_short
+        self.batch = batch
+
+    def send_buffer(self, buf):
+        """
+        :param buf: a KeyBuffer
+        :return: None
+        """
+        for condition, inputs in buf.segments:
+            if condition is not None:
+                vk, lock = condition
+                if bool(self._user32.GetKeyState(vk) & 1) != (lock == keys.LOCK_IF_ON):
+                    continue
+            for start in range(0, len(inputs), self.batch):
+                count = min(self.batch, len(inputs) - start)
+                chunk = (INPUT * count).from_buffer(inputs, start * sizeof(INPUT))
+                if self._user32.SendInput(count, chunk, sizeof(INPUT)) != count:
+                    raise WinError()  # e.g. blocked by a window of higher integrity level
+
+    def send(self, keys_, flag=0):
+        """Like autoit.send, without key delays; the keys are encoded once, see get_buffer.
+
+        :return: None
+        """
+        self.send_buffer(get_buffer(keys_, flag))
+
+    def mouse_move(self, x, y, speed=10):
+        from . import autoit
+        autoit.mouse_move(x, y, speed)
+
+    def mouse_click(self, x=None, y=None, button='', clicks=1, speed=10):
+        from . import autoit
+        autoit.mouse_click(x, y, button, clicks, speed)
+
+    def mouse_wheel(self, direction, clicks=1):
+        from . import autoit
+        autoit.mouse_wheel(direction, clicks)
+
+    def set_option(self, option, value):
+        from . import autoit
+        return autoit.set_option(option, value)
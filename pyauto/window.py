@@ -1,12 +1,16 @@
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
 from ctypes import *
 import platform
 import os
+import re
 
 
-user32 = windll.user32
+if os.name == 'nt':
+    user32 = windll.user32
 
-
-EnumWindowsProc = WINFUNCTYPE(c_bool, POINTER(c_void_p), POINTER(c_long))
+    EnumWindowsProc = WINFUNCTYPE(c_bool, POINTER(c_void_p), POINTER(c_long))
+    _EnumWindowsProc = WINFUNCTYPE(c_bool, c_void_p, c_void_p)  # hwnd as an int, usable as a key
 
 
 def win_list(filter=None):
@@ -23,8 +27,22 @@ def win_list(filter=None):
     return hwnd_list
 
 
-user32.GetWindowTextLengthW.argtypes = [c_void_p]
-user32.GetWindowTextW.argtypes = [c_void_p, c_wchar_p, c_int]
+class RECT(Structure):
+    _fields_ = [
+        ('left', c_long),
+        ('top', c_long),
+        ('right', c_long),
+        ('bottom', c_long)
+    ]
+
+
+if os.name == 'nt':
+    user32.GetWindowTextLengthW.argtypes = [c_void_p]
+    user32.GetWindowTextW.argtypes = [c_void_p, c_wchar_p, c_int]
+    user32.GetClassNameW.argtypes = [c_void_p, c_wchar_p, c_int]
+    user32.GetWindowThreadProcessId.argtypes = [c_void_p, POINTER(c_ulong)]
+    user32.GetWindowRect.argtypes = [c_void_p, POINTER(RECT)]
+    user32.IsWindowVisible.argtypes = [c_void_p]
 
 
 def win_title(hwnd):
@@ -32,3 +50,145 @@ def win_title(hwnd):
     buff = create_unicode_buffer(length + 1)
     user32.GetWindowTextW(hwnd, buff, length + 1)
     return buff.value
+
+
+class Window(namedtuple('Window', ['hwnd', 'title', 'class_name', 'pid', 'rect', 'visible'])):
+    """A top-level window as enumerated by WindowSnapshot.
+    rect is a tuple of left, top, right, bottom in screen coordinates.
+    """
+
+    __slots__ = ()
+
+
+def enum_windows():
+    """Walks the top-level windows once, querying each of them with a few calls into a reused buffer.
+
+    :return: list of Window, in Z order, hidden windows included
+    """
+    if os.name != 'nt':
+        raise RuntimeError('no window enumeration on this platform, pass the windows to WindowSnapshot')
+
+    hwnds = []
+    proc = _EnumWindowsProc(lambda hwnd, lParam: hwnds.append(hwnd) or True)
+    user32.EnumWindows(proc, 0)
+
+    windows = []
+    buff = create_unicode_buffer(512)
+    pid = c_ulong()
+    rect = RECT()
+    for hwnd in hwnds:
+        length = user32.GetWindowTextW(hwnd, buff, len(buff))
+        if length < len(buff) - 1:
+            title = buff.value
+        else:
+            title = win_title(hwnd)  # may be truncated
+        user32.GetClassNameW(hwnd, buff, 257)  # class names have at most 256 characters
+        class_name = buff.value
+        user32.GetWindowThreadProcessId(hwnd, byref(pid))
+        user32.GetWindowRect(hwnd, byref(rect))
+        windows.append(Window(hwnd, title, class_name, pid.value, (rect.left, rect.top, rect.right, rect.bottom),
+                              bool(user32.IsWindowVisible(hwnd))))
+    return windows
+
+
+class WindowSnapshot(object):
+    """The top-level windows at one point in time, indexed for lookups by title, class and PID.
+    Take one snapshot per round of lookups instead of walking the windows for each, as autoit.win_exists does:
+
+        windows = WindowSnapshot()
+        editors = windows.title_contains(u'Notepad')
+
+    Lookups return lists of Window in Z order, topmost first.
+    """
+
+    def __init__(self, windows=None):
+        """
+        :param windows: list of Window, e.g. to look up windows off Windows; enumerated with enum_windows by default
+        """
+        self.windows = enum_windows() if windows is None else list(windows)
+        self._by_title = {}
+        self._by_class = {}
+        self._by_pid = {}
+        for i, w in enumerate(self.windows):
+            self._by_title.setdefault(w.title, []).append(i)
+            self._by_class.setdefault(w.class_name, []).append(i)
+            self._by_pid.setdefault(w.pid, []).append(i)
+        # Sorted titles for prefix lookups; for substring lookups, see _joined
+        self._sorted = sorted((w.title, i) for i, w in enumerate(self.windows))
+        self._joined_titles = {}
+        self._found = {}  # memoized substring and regex lookups
+
+    def _joined(self, case_sensitive):
+        # The titles joined by NULs, which titles cannot contain, lower case unless case_sensitive, along with where
+        # each title starts; titles are lowered one by one, as lowering may change their length, e.g. of u'\u0130'
+        joined = self._joined_titles.get(case_sensitive)
+        if joined is None:
+            titles = [w.title if case_sensitive else w.title.lower() for w in self.windows]
+            offsets, offset = [], 0
+            for title in titles:
+                offsets.append(offset)
+                offset += len(title) + 1
+            joined = self._joined_titles[case_sensitive] = u'\0'.join(titles), offsets
+        return joined
+
+    def __len__(self):
+        return len(self.windows)
+
+    def __iter__(self):
+        return iter(self.windows)
+
+    def _select(self, indexes, visible):
+        return [self.windows[i] for i in indexes if visible is None or self.windows[i].visible == visible]
+
+    def with_title(self, title, visible=None):
+        """
+        :param title: the exact title
+        :param visible: True or False to keep only visible or hidden windows, None for both
+        """
+        return self._select(self._by_title.get(title, ()), visible)
+
+    def with_class(self, class_name, visible=None):
+        return self._select(self._by_class.get(class_name, ()), visible)
+
+    def with_pid(self, pid, visible=None):
+        return self._select(self._by_pid.get(pid, ()), visible)
+
+    def title_starts_with(self, prefix, visible=None):
+        """Like the default title match mode of AutoIt."""
+        start = bisect_left(self._sorted, (prefix,))
+        end = start
+        while end < len(self._sorted) and self._sorted[end][0].startswith(prefix):
+            end += 1
+        return self._select(sorted(i for _, i in self._sorted[start:end]), visible)
+
+    def title_contains(self, text, case_sensitive=True, visible=None):
+        """
+        :param text: a substring of the title
+        :param case_sensitive: False to ignore case, as the title match mode -2 of AutoIt
+        """
+        key = ('contains', text, case_sensitive)
+        indexes = self._found.get(key)
+        if indexes is None:
+            haystack, offsets = self._joined(case_sensitive)
+            if not case_sensitive:
+                text = text.lower()
+            indexes = []
+            pos = haystack.find(text) if self.windows else -1
+            while pos >= 0:
+                i = bisect_right(offsets, pos) - 1
+                indexes.append(i)
+                # Go on from the next title, each window is found once
+                pos = haystack.find(text, offsets[i + 1]) if i + 1 < len(offsets) else -1
+            self._found[key] = indexes
+        return self._select(indexes, visible)
+
+    def title_matches(self, pattern, visible=None):
+        """
+        :param pattern: a regular expression searched in the titles, as a string or compiled
+        """
+        key = ('matches', pattern)
+        indexes = self._found.get(key)
+        if indexes is None:
+            search = re.compile(pattern).search
+            indexes = self._found[key] = [i for i, w in enumerate(self.windows) if search(w.title)]
+        return self._select(indexes, visible)
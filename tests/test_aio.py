@@ -0,0 +1,76 @@
+import asyncio
+import gc
+import threading
+
+import numpy as np
+
+from pyauto import aio, capture, process
+
+
+def setup_function(function):
+    process.set_backend(process.ListBackend([('a.exe', 10)]))
+    capture.set_backend(capture.ArrayBackend(np.zeros((100, 100, 3), np.uint8)))
+
+
+def teardown_function(function):
+    process.set_backend(None)
+    capture.set_backend(None)
+
+
+def test_many_waits_share_one_thread():
+    backend = process.get_backend()
+
+    async def main():
+        before = threading.active_count()
+        waits = [asyncio.ensure_future(aio.wait_process('b.exe', timeout=2)) for _ in range(200)]
+        waits += [asyncio.ensure_future(aio.wait_process_close(10, timeout=2)) for _ in range(200)]
+        await asyncio.sleep(0.15)
+        assert threading.active_count() - before == 1
+        backend.start('b.exe', 20)
+        backend.exit(10)
+        results = await asyncio.gather(*waits)
+        assert set(results[:200]) == {20}
+        assert set(results[200:]) == {True}
+
+    asyncio.run(main())
+
+
+def test_timeouts_and_pixel_change():
+    async def main():
+        pixels = asyncio.ensure_future(aio.wait_pixel_change(0, 0, 63, 63, timeout=2, tile=32))
+        assert await aio.wait_process('never.exe', timeout=0.1) == 0
+        assert await aio.wait_process_close(10, timeout=0.1) is False
+        screen = np.zeros((100, 100, 3), np.uint8)
+        screen[40:42, 10:12] = 255
+        capture.get_backend().set_pixels(screen)
+        assert await pixels == [(0, 32, 32, 32)]
+
+    asyncio.run(main())
+
+
+def test_cancelled_wait_is_dropped():
+    async def main():
+        wait = asyncio.ensure_future(aio.wait_process('never.exe'))
+        await asyncio.sleep(0.05)
+        wait.cancel()
+        await asyncio.sleep(0.2)
+        assert aio.get_poller()._task is None
+
+    asyncio.run(main())
+
+
+def test_closed_loops_release_their_pollers():
+    async def main():
+        await aio.wait_process('a.exe', timeout=1)
+        asyncio.ensure_future(aio.wait_process('never.exe'))  # still pending when the loop closes
+
+    before = threading.active_count()
+    for _ in range(3):
+        asyncio.run(main())
+    gc.collect()
+    assert len(aio._pollers) == 0
+    for _ in range(50):
+        if threading.active_count() == before:
+            break
+        threading.Event().wait(0.02)
+    assert threading.active_count() == before
@@ -0,0 +1,19 @@
+import numpy as np
+import pytest
+
+from pyauto import capture
+
+
+def test_crop_views_the_frame():
+    frame = capture.Frame(np.arange(10 * 20 * 4, dtype=np.uint8).reshape(10, 20, 4), 100, 50)
+    crop = frame.crop(105, 52, 4, 3)
+    assert (crop.x, crop.y, crop.width, crop.height) == (105, 52, 4, 3)
+    assert (crop.pixels == frame.pixels[2:5, 5:9]).all()
+
+
+def test_crop_out_of_frame():
+    frame = capture.Frame(np.zeros((10, 20, 4), np.uint8), 100, 50)
+    with pytest.raises(ValueError):
+        frame.crop(95, 50, 10, 10)
+    with pytest.raises(ValueError):
+        frame.crop(110, 55, 20, 2)
@@ -0,0 +1,65 @@
+import pytest
+
+from pyauto.inputseq import InputSequence, RecordingBackend, escape
+
+
+class FailingBackend(RecordingBackend):
+    def mouse_click(self, *args):
+        raise RuntimeError('click failed')
+
+
+def test_escape():
+    assert escape(u'a+b {c}!') == u'a{+}b {{}c{}}{!}'
+
+
+def test_consecutive_sends_merge():
+    seq = InputSequence().text(u'John').key('TAB').text(u'1+1').key('ENTER', 2)
+    assert seq.compile() == [('send', u'John{TAB}1{+}1{ENTER 2}')]
+    assert len(seq) == 4
+
+
+def test_no_merge_after_trailing_modifier():
+    seq = InputSequence().send(u'^').send(u'c').send(u'v')
+    assert seq.compile() == [('send', u'^'), ('send', u'cv')]
+    # an escaped modifier is a plain character
+    assert InputSequence().text(u'^').send(u'c').compile() == [('send', u'{^}c')]
+
+
+def test_move_folds_into_click():
+    seq = InputSequence().move(1, 2).move(30, 40, 5).click()
+    assert seq.compile() == [('mouse_click', 30, 40, '', 1, 5)]
+    seq = InputSequence().move(30, 40).click(50, 60, 'right')
+    assert seq.compile() == [('mouse_click', 50, 60, 'right', 1, 0)]
+    seq = InputSequence().move(30, 40).send(u'a').click()
+    assert [call[0] for call in seq.compile()] == ['mouse_move', 'send', 'mouse_click']
+
+
+def test_clicks_and_wheel_add_up():
+    seq = InputSequence().click(10, 20).click().click(clicks=2).wheel('down').wheel('down', 3).wheel('up')
+    assert seq.compile() == [('mouse_click', 10, 20, '', 4, 0), ('mouse_wheel', 'down', 4), ('mouse_wheel', 'up', 1)]
+    # a click elsewhere or with another button is separate
+    seq = InputSequence().click(10, 20).click(30, 40).click(button='right')
+    assert len(seq.compile()) == 3
+
+
+def test_run_sets_and_restores_options():
+    backend = RecordingBackend()
+    backend.options['SendKeyDelay'] = 5
+    calls = InputSequence({'SendKeyDelay': 0}).text(u'ab').click(1, 2).run(backend)
+    assert calls == 2
+    assert backend.calls == [
+        ('set_option', 'SendKeyDelay', 0),
+        ('send', u'ab', 0),
+        ('mouse_click', 1, 2, '', 1, 0),
+        ('set_option', 'SendKeyDelay', 5),
+    ]
+
+
+def test_options_restored_when_a_call_raises():
+    backend = FailingBackend()
+    backend.options['MouseClickDelay'] = 10
+    seq = InputSequence({'MouseClickDelay': 0}).click(1, 2).send(u'a')
+    with pytest.raises(RuntimeError):
+        seq.run(backend)
+    assert backend.options['MouseClickDelay'] == 10
+    assert [call[0] for call in backend.calls] == ['set_option', 'set_option']
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from pyauto import keys, sendinput
+from pyauto.keys import KEYEVENTF_EXTENDEDKEY as EXT, KEYEVENTF_KEYUP as UP, KEYEVENTF_UNICODE as UNI
+
+
+def _tap(vk, flags=0):
+    return [(vk, 0, flags), (vk, 0, flags | UP)]
+
+
+def _typed(c):
+    return [(0, ord(c), UNI), (0, ord(c), UNI | UP)]
+
+
+def test_tokenize():
+    assert keys.tokenize(u'^a{Enter 2}!') == [(u'^', u'a', u''), (u'', u'ENTER', u'2'), (u'', u'ALT', u'')]
+    assert keys.tokenize(u'{{}{}}{NUMLOCK Toggle}') == [(u'', u'{', u''), (u'', u'}', u''), (u'', u'NUMLOCK', u'toggle')]
+
+
+@pytest.mark.parametrize('text, position', [
+    (u'ab{ENTER', 2),
+    (u'{NOSUCHKEY}', 0),
+    (u'x{TAB many}', 1),
+    (u'{ENTER on}', 0),
+    (u'{ASC x}', 0),
+    (u'{ALTDOWN 2}', 0),
+    (u'{é down}', 0),
+])
+def test_syntax_errors(text, position):
+    with pytest.raises(keys.SendSyntaxError) as info:
+        keys.parse(text)
+    assert info.value.position == position
+    assert info.value.keys == text
+
+
+def test_plain_text_is_typed_as_unicode():
+    assert keys.parse(u'hé') == _typed(u'h') + _typed(u'é')
+    assert keys.parse(u'\U0001F600') == [(0, 0xD83D, UNI), (0, 0xDE00, UNI), (0, 0xD83D, UNI | UP),
+                                         (0, 0xDE00, UNI | UP)]
+
+
+def test_raw_flag_types_special_characters():
+    assert keys.parse(u'^{a}', 1) == _typed(u'^') + _typed(u'{') + _typed(u'a') + _typed(u'}')
+
+
+def test_modifier_characters_make_shortcuts():
+    assert keys.parse(u'^c') == [(keys.VK_CONTROL, 0, 0)] + _tap(ord('C')) + [(keys.VK_CONTROL, 0, UP)]
+    assert keys.parse(u'!A') == [(keys.VK_MENU, 0, 0), (keys.VK_SHIFT, 0, 0)] + _tap(ord('A')) + [
+        (keys.VK_SHIFT, 0, UP), (keys.VK_MENU, 0, UP)]
+    assert keys.parse(u'{DEL}') == _tap(0x2E, EXT)
+    assert keys.parse(u'{TAB 3}') == _tap(keys.VK_TAB) * 3
+
+
+def test_held_modifiers_make_shortcuts():
+    ctrl = keys.VK_CONTROL
+    assert keys.parse(u'{CTRLDOWN}c{CTRLUP}') == [(ctrl, 0, 0)] + _tap(ord('C')) + [(ctrl, 0, UP)]
+    # Not pressed and released again inside, which would release the held key
+    assert keys.parse(u'{CTRLDOWN}^c{CTRLUP}') == keys.parse(u'{CTRLDOWN}c{CTRLUP}')
+    assert keys.parse(u'{LCTRL down}v{LCTRL up}x') == [(0xA2, 0, 0)] + _tap(ord('V')) + [(0xA2, 0, UP)] + _typed(u'x')
+
+
+def test_held_shift_types_upper_case():
+    shift = keys.VK_SHIFT
+    assert keys.parse(u'{SHIFTDOWN}aB{SHIFTUP}') == [(shift, 0, 0)] + _tap(ord('A')) + _tap(ord('B')) + [
+        (shift, 0, UP)]
+
+
+def test_lock_conditions():
+    assert keys.parse(u'{CAPSLOCK on}') == _tap(0x14, keys.LOCK_IF_OFF)
+    assert keys.parse(u'{NUMLOCK off}') == _tap(0x90, EXT | keys.LOCK_IF_ON)
+
+
+def test_asc():
+    assert keys.parse(u'{ASC 65}') == [(keys.VK_MENU, 0, 0)] + _tap(keys.VK_NUMPAD0 + 6) + \
+        _tap(keys.VK_NUMPAD0 + 5) + [(keys.VK_MENU, 0, UP)]
+
+
+def test_compile_keys_is_memoized():
+    keys.compiled.clear()
+    events = keys.compile_keys(u'abc{ENTER}')
+    assert keys.compile_keys(u'abc{ENTER}') is events
+    assert keys.validate(u'{TAB}') == u'{TAB}'
+    with pytest.raises(keys.SendSyntaxError):
+        keys.validate(u'{TAB')
+
+
+def test_key_buffer_segments():
+    buf = sendinput.KeyBuffer(u'a{CAPSLOCK on}b')
+    assert [condition for condition, _ in buf.segments] == [None, (0x14, keys.LOCK_IF_OFF), None]
+    assert len(buf) == 6
+    inputs = buf.segments[0][1]
+    assert (inputs[1].type, inputs[1].u.ki.wScan, inputs[1].u.ki.dwFlags) == (sendinput.INPUT_KEYBOARD, ord('a'),
+                                                                              UNI | UP)
+    assert buf.segments[1][1][0].u.ki.dwFlags == 0
+    assert sendinput.get_buffer(u'a{CAPSLOCK on}b') is sendinput.get_buffer(u'a{CAPSLOCK on}b')
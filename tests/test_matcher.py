@@ -0,0 +1,177 @@
+import os
+import struct
+
+import numpy as np
+import pytest
+
+from pyauto import capture, image, matcher
+
+
+def _brute_force(hay, needle, tolerance):
+    # The first offset, in rows top to bottom, where every channel is within tolerance
+    hay = hay.astype(np.int16)
+    needle = needle.astype(np.int16)
+    h, w, c = needle.shape
+    for y in range(hay.shape[0] - h + 1):
+        for x in range(hay.shape[1] - w + 1):
+            if np.abs(hay[y:y + h, x:x + w, :c] - needle).max() <= tolerance:
+                return x, y
+    return None
+
+
+def _found(res):
+    return None if res is None else res.top_left
+
+
+@pytest.mark.parametrize('tolerance', [0, 60, 255])
+def test_find_agrees_with_brute_force(tolerance):
+    rng = np.random.RandomState(tolerance)
+    for _ in range(10):
+        hay = (rng.randint(0, 3, (30, 40, 3)) * 100).astype(np.uint8)
+        y, x = rng.randint(0, 26), rng.randint(0, 35)
+        needle = hay[y:y + 5, x:x + 6].copy()
+        needle[0, 0] = np.clip(needle[0, 0].astype(int) + 30, 0, 255)  # an inexact copy
+        assert _found(matcher.find(hay, needle, tolerance)) == _brute_force(hay, needle, tolerance)
+
+
+def test_find_bgra_haystack_bgr_needle():
+    rng = np.random.RandomState(1)
+    hay = rng.randint(0, 256, (20, 30, 4)).astype(np.uint8)
+    needle = hay[7:12, 11:19, :3].copy()
+    hay[:, :, 3] = 0  # alpha is not compared
+    res = matcher.find(hay, needle, 0)
+    assert (res.x, res.y, res.width, res.height, res.score) == (11, 7, 8, 5, 1.0)
+
+
+def test_find_needle_larger_than_haystack():
+    hay = np.zeros((10, 10, 3), np.uint8)
+    assert matcher.find(hay, np.zeros((11, 5, 3), np.uint8)) is None
+    assert matcher.find(hay, np.zeros((5, 11, 3), np.uint8)) is None
+    assert _found(matcher.find(hay, np.zeros((10, 10, 3), np.uint8))) == (0, 0)
+
+
+@pytest.mark.parametrize('y, x', [(0, 0), (0, 34), (25, 0), (25, 34)])
+def test_find_at_the_edges(y, x):
+    rng = np.random.RandomState(2)
+    hay = rng.randint(0, 256, (30, 40, 3)).astype(np.uint8)
+    needle = hay[y:y + 5, x:x + 6].copy()
+    assert _found(matcher.find(hay, needle, 0)) == (x, y) == _brute_force(hay, needle, 0)
+
+
+@pytest.fixture
+def screen():
+    rng = np.random.RandomState(3)
+    pixels = rng.randint(0, 256, (120, 160, 3)).astype(np.uint8)
+    capture.set_backend(capture.ArrayBackend(pixels))
+    yield pixels
+    capture.set_backend(None)
+
+
+def test_image_search_numpy_engine(screen):
+    needle = screen[50:60, 70:85].copy()
+    assert image.search(needle, 0, 0, 160, 120, 0, engine='numpy') == (70, 50)
+    assert image.search(needle, 40, 30, 60, 40, 0, position='center', engine='numpy') == (77, 55)
+    assert image.search(needle, 0, 0, 60, 60, 0, engine='numpy') == (False, False)
+
+
+def test_search_many(screen):
+    first, second = screen[10:20, 10:20].copy(), screen[90:100, 130:150].copy()
+    missing = np.zeros((8, 8, 3), np.uint8)
+    found = image.search_many([matcher.Template(first), matcher.Template(second), matcher.Template(missing)],
+                              5, 5, 150, 110, 0)
+    assert [_found(res) for res in found.values()].count(None) == 1
+    assert sorted(_found(res) for res in found.values() if res is not None) == [(10, 10), (130, 90)]
+
+
+def test_find_coarse_agrees_with_find():
+    rng = np.random.RandomState(4)
+    hay = rng.randint(0, 256, (200, 300, 3)).astype(np.uint8)
+    needle = hay[120:152, 170:218].copy()
+    for candidates in (1, 8):
+        assert _found(matcher.find_coarse(hay, needle, 20, levels=2, candidates=candidates)) == (170, 120)
+    assert _found(matcher.find(hay, needle, 20)) == (170, 120)
+
+
+def _write_bmp(path, pixels):
+    # A bottom-up 24-bit bitmap, rows padded to 4 bytes
+    height, width = pixels.shape[:2]
+    stride = (width * 3 + 3) & ~3
+    rows = b''.join(pixels[y].tobytes() + b'\0' * (stride - width * 3) for y in range(height - 1, -1, -1))
+    header = struct.pack('<2sIHHI', b'BM', 54 + len(rows), 0, 0, 54)
+    info = struct.pack('<IiiHHIIiiII', 40, width, height, 1, 24, 0, len(rows), 0, 0, 0, 0)
+    with open(path, 'wb') as f:
+        f.write(header + info + rows)
+
+
+def test_template_cache(tmp_path):
+    path = str(tmp_path / 'button.bmp')
+    pixels = np.arange(5 * 3 * 3, dtype=np.uint8).reshape(5, 3, 3)
+    _write_bmp(path, pixels)
+    cache = matcher.TemplateCache()
+    first = cache.load(path)
+    assert (first.pixels == pixels).all()
+    assert cache.load(path) is first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    _write_bmp(path, pixels[::-1].copy())
+    os.utime(path, (os.path.getmtime(path) + 10,) * 2)
+    second = cache.load(path)
+    assert second is not first
+    assert (second.pixels == pixels[::-1]).all()
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def _scores(matches):
+    return [round(m.score, 9) for m in matches]
+
+
+def test_find_all_max_results_zero():
+    hay = np.full((50, 50, 3), 90, np.uint8)
+    assert matcher.find_all(hay, hay[:20, :20].copy(), max_results=0) == []
+
+
+def test_find_all_max_results_agrees_with_full_search():
+    rng = np.random.RandomState(0)
+    for _ in range(50):
+        hay = rng.randint(0, 4, (60, 80, 3)).astype(np.uint8) * 60
+        needle = hay[10:16, 20:27].copy()
+        tolerance = rng.choice([0, 40, 130])
+        overlap = rng.choice([0.0, 0.3, 0.8])
+        count = rng.randint(1, 6)
+        full = matcher.find_all(hay, needle, tolerance, overlap=overlap)
+        capped = matcher.find_all(hay, needle, tolerance, overlap=overlap, max_results=count)
+        assert _scores(capped) == _scores(full[:count])
+
+
+def test_find_all_max_results_on_flat_screen():
+    hay = np.full((300, 400, 3), 90, np.uint8)
+    found = matcher.find_all(hay, np.full((20, 20, 3), 90, np.uint8), max_results=3)
+    assert [m.score for m in found] == [1.0, 1.0, 1.0]
+
+
+def test_locality_cache_rejects_arrays():
+    cache = matcher.LocalityCache()
+    with pytest.raises(TypeError):
+        cache.search(np.zeros((2, 2, 3), np.uint8), 0, 0, 10, 10, lambda *area: None)
+
+
+def test_locality_cache_keyed_on_template():
+    hay = np.zeros((100, 100, 3), np.uint8)
+    hay[60:70, 30:40] = 200
+    tpl = matcher.Template(hay[58:72, 28:42].copy())
+    cache = matcher.LocalityCache(margin=4)
+
+    def search(x, y, width, height):
+        res = matcher.find(hay[y:y + height, x:x + width], tpl, 0)
+        return None if res is None else res.translate(x, y)
+    assert tuple(cache.search(tpl, 0, 0, 100, 100, search)) == (28, 58, 14, 14)
+    assert tuple(cache.search(tpl, 0, 0, 100, 100, search)) == (28, 58, 14, 14)
+    assert (cache.hits, cache.fallbacks) == (1, 0)
+
+
+def test_match_parse():
+    res = matcher.Match.parse(b'1|10|20|30|40', 'button.bmp')
+    assert (tuple(res), res.template, res.score) == ((10, 20, 30, 40), 'button.bmp', None)
+    assert matcher.Match.parse(b'0') is None
+    assert matcher.Match.parse(None) is None
+    assert tuple(matcher.Match.parse(u'1|1|2|3|4')) == (1, 2, 3, 4)
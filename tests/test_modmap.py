@@ -0,0 +1,87 @@
+from pyauto import process
+from pyauto.modmap import ModuleCache, ModuleMap
+
+
+def _module(name, base, size, pid=10):
+    return {'name': name, 'path': 'C:\\' + name, 'pid': pid, 'base_address': base, 'base_size': size}
+
+
+class FlakyBackend(process.ListBackend):
+    """A ListBackend whose module snapshots fail while ``failing`` is set."""
+
+    failing = False
+
+    def modules(self, pid, errors=None):
+        if self.failing:
+            if errors is not None:
+                errors.append(process.ProcessError(299, 'Module32First', pid))  # ERROR_PARTIAL_COPY
+            return []
+        return process.ListBackend.modules(self, pid, errors)
+
+
+def test_address_to_module_bounds():
+    kernel32 = _module('kernel32.dll', 0x7000, 0x1000)
+    app = _module('App.exe', 0x4000, 0x2000)
+    module_map = ModuleMap([kernel32, app])
+    assert [m['name'] for m in module_map] == ['App.exe', 'kernel32.dll']
+    assert module_map.address_to_module(0x4000) is app
+    assert module_map.address_to_module(0x5fff) is app
+    assert module_map.address_to_module(0x6000) is None  # between the modules
+    assert module_map.address_to_module(0x7fff) is kernel32
+    assert module_map.address_to_module(0x8000) is None
+    assert module_map.address_to_module(0x3fff) is None
+    assert module_map.address_to_module(0) is None
+    assert ModuleMap([]).address_to_module(0x4000) is None
+
+
+def test_find_module_ignores_case():
+    module_map = ModuleMap([_module('KERNEL32.DLL', 0x7000, 0x1000)])
+    assert module_map.find_module('kernel32.dll')['base_address'] == 0x7000
+    assert module_map.find_module('user32.dll') is None
+
+
+def test_reused_pid_gets_a_new_map():
+    backend = process.ListBackend([('a.exe', 10)])
+    backend.modules_by_pid[10] = [_module('a.exe', 0x4000, 0x1000)]
+    process.set_backend(backend)
+    cache = ModuleCache()
+    first = cache.modules(10)
+    assert cache.modules(10) is first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    backend.exit(10)
+    backend.start('b.exe', 10)
+    backend.modules_by_pid[10] = [_module('b.exe', 0x4000, 0x1000)]
+    second = cache.modules(10)
+    assert second is not first
+    assert second.find_module('b.exe') is not None
+    assert len(cache) == 1  # the map of the exited process is dropped
+
+
+def test_failed_snapshot_is_not_cached():
+    backend = FlakyBackend([('a.exe', 10)])
+    backend.modules_by_pid[10] = [_module('a.exe', 0x4000, 0x1000)]
+    process.set_backend(backend)
+    cache = ModuleCache()
+    backend.failing = True
+    errors = []
+    assert len(cache.modules(10, errors)) == 0
+    assert [(e.code, e.pid) for e in errors] == [(299, 10)]
+    assert len(cache) == 0
+
+    backend.failing = False
+    assert cache.address_to_module(10, 0x4800)['name'] == 'a.exe'
+    assert len(cache) == 1
+
+
+def test_process_gone_drops_its_map():
+    backend = process.ListBackend([('a.exe', 10), ('b.exe', 11)])
+    process.set_backend(backend)
+    cache = ModuleCache()
+    cache.modules(10)
+    cache.modules(11)
+    backend.exit(10)
+    assert len(cache.modules(10)) == 0
+    assert len(cache) == 1
+    cache.prune([])
+    assert len(cache) == 0
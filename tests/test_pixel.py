@@ -0,0 +1,93 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from pyauto import capture, pixel
+
+
+def _bgr(color):
+    return [color & 0xFF, color >> 8 & 0xFF, color >> 16 & 0xFF]
+
+
+@pytest.fixture
+def screen():
+    pixels = np.zeros((60, 80, 3), np.uint8)
+    backend = capture.ArrayBackend(pixels)
+    capture.set_backend(backend)
+    yield backend
+    capture.set_backend(None)
+
+
+def _paint(backend, points, color):
+    pixels = backend.pixels[:, :, :3].copy()
+    for x, y in points:
+        pixels[y, x] = _bgr(color)
+    backend.set_pixels(pixels)
+
+
+def test_get_colors(screen):
+    _paint(screen, [(3, 4)], 0x123456)
+    _paint(screen, [(70, 50)], 0xFF0000)
+    assert pixel.get_colors([(3, 4), (70, 50), (0, 0)]) == [0x123456, 0xFF0000, 0]
+    assert pixel.get_colors([]) == []
+
+
+def test_get_colors_outside_the_frame(screen):
+    _paint(screen, [(12, 11)], 0x00FF00)
+    frame = capture.grab(10, 10, 5, 5)
+    assert pixel.get_colors([(12, 11), (9, 10), (15, 12), (12, 20)], frame) == [0x00FF00, -1, -1, -1]
+
+
+def test_search_first_match_in_scan_order(screen):
+    _paint(screen, [(50, 5), (10, 20), (30, 20)], 0xFF8000)
+    assert pixel.search(0, 0, 79, 59, 0xFF8000) == (50, 5)
+    assert pixel.search(0, 10, 79, 59, 0xFF8000) == (10, 20)
+    assert pixel.search(11, 10, 79, 59, 0xFF8000) == (30, 20)
+    assert pixel.search(0, 0, 79, 59, 0x0000FF) == (False, False)
+
+
+def test_search_find_all_step_and_shade_variation(screen):
+    _paint(screen, [(10, 20), (30, 20)], 0xFF8000)
+    _paint(screen, [(11, 20)], 0xF08810)
+    assert pixel.search(0, 0, 79, 59, 0xFF8000, find_all=True) == [(10, 20), (30, 20)]
+    assert pixel.search(0, 0, 79, 59, 0xFF8000, shade_variation=16, find_all=True) == [(10, 20), (11, 20), (30, 20)]
+    assert pixel.search(0, 0, 79, 59, 0xFF8000, shade_variation=15, find_all=True) == [(10, 20), (30, 20)]
+    # Every other pixel from the left and top of the rectangle
+    assert pixel.search(0, 0, 79, 59, 0xFF8000, step=2, find_all=True) == [(10, 20), (30, 20)]
+    assert pixel.search(1, 0, 79, 59, 0xFF8000, step=2, shade_variation=16) == (11, 20)
+
+
+def test_search_in_a_frame(screen):
+    _paint(screen, [(10, 20)], 0xFF8000)
+    frame = capture.grab(0, 0, 80, 60)
+    assert pixel.search(5, 15, 15, 25, 0xFF8000, frame=frame) == (10, 20)
+
+
+def test_change_detector_clips_edge_tiles(screen):
+    detector = pixel.ChangeDetector(0, 0, 69, 49, tile=32)  # 70x50: tiles of 32 and 38 - 32 = 6
+    assert detector.update() == []
+    assert detector.update() == []
+    _paint(screen, [(5, 5), (68, 48)], 0xFFFFFF)
+    assert detector.update() == [(0, 0, 32, 32), (64, 32, 6, 18)]
+    assert detector.update() == []
+
+
+def test_change_detector_on_frames(screen):
+    detector = pixel.ChangeDetector(10, 10, 29, 29, tile=10)
+    detector.update(capture.grab(0, 0, 80, 60).copy())
+    _paint(screen, [(25, 12)], 0x010000)
+    assert detector.update(capture.grab(0, 0, 80, 60).copy()) == [(20, 10, 10, 10)]
+
+
+def test_wait_for_change_times_out(screen):
+    start = time.time()
+    assert pixel.wait_for_change(0, 0, 39, 39, timeout=0.2, interval=0.02) == []
+    assert 0.2 <= time.time() - start < 1
+
+
+def test_wait_for_change(screen):
+    timer = threading.Timer(0.1, _paint, (screen, [(39, 39)], 0x808080))
+    timer.start()
+    assert pixel.wait_for_change(0, 0, 39, 39, timeout=2, interval=0.02, tile=16) == [(32, 32, 8, 8)]
@@ -0,0 +1,197 @@
+import threading
+import time
+
+from pyauto import process
+
+
+class HangingBackend(process.ListBackend):
+    """Module lookups of the pids in ``hang`` block until ``release`` is set."""
+
+    def __init__(self, entries, hang=()):
+        super(HangingBackend, self).__init__(entries)
+        self.hang = set(hang)
+        self.release = threading.Event()
+        self.looked_up = []
+
+    def modules(self, pid, errors=None):
+        self.looked_up.append(pid)
+        if pid in self.hang:
+            self.release.wait()
+        return [{'name': 'mod%d' % pid}]
+
+
+def _setup(hang=()):
+    backend = HangingBackend([('p%d.exe' % pid, pid) for pid in range(1, 9)], hang)
+    process.set_backend(backend)
+    return backend, [process.Process(name=name, pid=pid) for name, pid, _, _, _ in backend.entries]
+
+
+def teardown_function(function):
+    process.set_backend(None)
+
+
+def test_collect_details_timeout_per_lookup():
+    backend, processes = _setup(hang=(1, 2))
+    errors = []
+    start = time.time()
+    try:
+        process.collect_details(processes, ('modules',), workers=2, timeout=0.2, errors=errors)
+    finally:
+        backend.release.set()
+    assert time.time() - start < 0.6
+    assert [(e.code, e.pid) for e in errors] == [(process.WAIT_TIMEOUT, 1), (process.WAIT_TIMEOUT, 2)]
+    assert [p['modules'] for p in processes[:2]] == [[], []]
+    assert [p['modules'] for p in processes[2:]] == [[{'name': 'mod%d' % pid}] for pid in range(3, 9)]
+
+
+def test_collect_details_deadline():
+    backend, processes = _setup(hang=range(1, 9))
+    errors = []
+    start = time.time()
+    try:
+        process.collect_details(processes, ('modules',), workers=2, errors=errors, deadline=0.2)
+    finally:
+        backend.release.set()
+    assert time.time() - start < 0.6
+    assert [e.code for e in errors] == [process.WAIT_TIMEOUT] * 2 + [process.ERROR_CANCELLED] * 6
+    assert all(p['modules'] == [] for p in processes)
+
+
+def test_collect_details_without_limits():
+    backend, processes = _setup()
+    errors = []
+    process.collect_details(processes, ('modules', 'priority_class'), workers=3, errors=errors)
+    assert errors == []
+    assert [p['modules'][0]['name'] for p in processes] == ['mod%d' % pid for pid in range(1, 9)]
+    assert sorted(backend.looked_up) == list(range(1, 9))
+
+
+def _exit_later(backend, pid, delay=0.1):
+    timer = threading.Timer(delay, backend.exit, (pid,))
+    timer.start()
+    return timer
+
+
+def test_wait_any_and_wait_all_on_list_backend():
+    backend = process.ListBackend([('a.exe', 10), ('b.exe', 11), ('b.exe', 12)])
+    process.set_backend(backend)
+    assert process.wait_any(['b.exe', 10], timeout=0.1) is None
+    _exit_later(backend, 10)
+    assert process.wait_any(['b.exe', 10], timeout=2) == 10
+    assert process.wait_all(['b.exe'], timeout=0.1) is False
+    _exit_later(backend, 11)
+    _exit_later(backend, 12, 0.2)
+    assert process.wait_all(['b.exe', 'gone.exe'], timeout=2) is True
+
+
+class FakeKernel32(object):
+    """OpenProcess and WaitForMultipleObjects over a ListBackend; the pids in ``denied`` cannot be opened."""
+
+    def __init__(self, backend, denied=()):
+        self.backend = backend
+        self.denied = set(denied)
+        self.last_error = 0
+        self.access = []  # access rights asked for by OpenProcess
+
+    def GetLastError(self):
+        return self.last_error
+
+    def OpenProcess(self, access, inherit, pid):
+        self.access.append(access)
+        if pid in self.denied:
+            self.last_error = 5  # ERROR_ACCESS_DENIED
+            return 0
+        if not any(entry[1] == pid for entry in self.backend.entries):
+            self.last_error = process.ERROR_INVALID_PARAMETER
+            return 0
+        return pid + 1000
+
+    def WaitForMultipleObjects(self, count, handles, wait_all, ms):
+        end = None if ms == process.INFINITE else time.time() + ms / 1000.0
+        while True:
+            running = set(entry[1] + 1000 for entry in self.backend.entries)
+            exited = [i for i, handle in enumerate(handles[:count]) if handle not in running]
+            if exited and (not wait_all or len(exited) == count):
+                return process.WAIT_OBJECT_0 + exited[0]
+            if end is not None and time.time() >= end:
+                return process.WAIT_TIMEOUT
+            time.sleep(0.005)
+
+    def CreateToolhelp32Snapshot(self, flags, pid):
+        self.last_error = 5  # ERROR_ACCESS_DENIED
+        return process.INVALID_HANDLE_VALUE
+
+    def GetPriorityClass(self, handle):
+        return 0x20  # NORMAL_PRIORITY_CLASS
+
+    def GetCurrentProcess(self):
+        return -1
+
+    def CloseHandle(self, handle):
+        return 1
+
+
+class FakeToolhelpBackend(process.ToolhelpBackend):
+    def __init__(self, backend):
+        self.backend = backend
+
+    def process_entries(self, errors=None):
+        return self.backend.process_entries(errors)
+
+
+def _toolhelp(monkeypatch, denied):
+    backend = process.ListBackend([('a.exe', 10), ('b.exe', 11)])
+    monkeypatch.setattr(process, 'kernel32', FakeKernel32(backend, denied), raising=False)
+    toolhelp = FakeToolhelpBackend(backend)
+    process.set_backend(toolhelp)
+    return backend, toolhelp
+
+
+def test_toolhelp_wait_polls_processes_it_cannot_open(monkeypatch):
+    backend, toolhelp = _toolhelp(monkeypatch, denied=(10, 11))
+    errors = []
+    start = time.time()
+    assert toolhelp.wait([10, 11], timeout=0.2, errors=errors) == []
+    assert time.time() - start >= 0.2
+    assert [(e.code, e.pid) for e in errors] == [(5, 10), (5, 11)]
+    _exit_later(backend, 11)
+    assert process.wait_any([10, 11], timeout=2) == 11
+    _exit_later(backend, 10)
+    assert process.wait_all([10], timeout=2) is True
+
+
+def test_toolhelp_wait_mixes_handles_and_polling(monkeypatch):
+    backend, toolhelp = _toolhelp(monkeypatch, denied=(10,))
+    _exit_later(backend, 10)
+    assert toolhelp.wait([10, 11], timeout=2) == [10]
+    _exit_later(backend, 11)
+    assert toolhelp.wait([11, 12], wait_all=True, timeout=2) == [12, 11]
+
+
+def test_toolhelp_priority_class_asks_for_limited_access(monkeypatch):
+    backend, toolhelp = _toolhelp(monkeypatch, denied=())
+    assert toolhelp.priority_class(10) == 0x20
+    assert process.kernel32.access == [process.PROCESS_QUERY_LIMITED_INFORMATION]
+
+
+def test_toolhelp_failed_process_snapshot_is_reported(monkeypatch):
+    backend, toolhelp = _toolhelp(monkeypatch, denied=())
+    errors = []
+    assert list(process.ToolhelpBackend.process_entries(toolhelp, errors)) == []
+    assert [(e.code, e.context) for e in errors] == [(5, 'CreateToolhelp32Snapshot')]
+
+
+class FailingAdvapi32(object):
+    def OpenProcessToken(self, hProcess, access, phToken):
+        raise process.ArgumentError('argument 2: wrong type')
+
+
+def test_debug_privilege_failure_is_recorded_not_raised(monkeypatch):
+    monkeypatch.setattr(process, 'kernel32', FakeKernel32(process.ListBackend([]), ()), raising=False)
+    monkeypatch.setattr(process, 'advapi32', FailingAdvapi32(), raising=False)
+    privilege = process.DebugPrivilege()
+    assert privilege.enable() is False
+    assert privilege.active is False
+    assert privilege.error.code is None
+    assert privilege.error.context.startswith('ArgumentError')
+    assert privilege.enable() is False  # not retried
@@ -0,0 +1,89 @@
+from pyauto import procfs
+from pyauto.procfs import ProcfsBackend
+
+
+def _stat_line(pid, comm, state='S', ppid=1, priority=20, nice=0, threads=1, starttime=1000):
+    # pid (comm) state ppid pgrp session tty_nr tpgid flags minflt cminflt majflt cmajflt utime stime cutime cstime
+    # priority nice num_threads itrealvalue starttime vsize...
+    fields = [state, ppid, pid, pid, 0, -1, 4194304, 0, 0, 0, 0, 0, 0, 0, 0, priority, nice, threads, 0, starttime, 0]
+    return '%d (%s) %s\n' % (pid, comm, ' '.join(str(field) for field in fields))
+
+
+def _process(root, pid, comm, maps='', tids=(), **kwargs):
+    directory = root / str(pid)
+    directory.mkdir()
+    (directory / 'stat').write_text(_stat_line(pid, comm, **kwargs))
+    (directory / 'maps').write_text(maps)
+    task = directory / 'task'
+    task.mkdir()
+    for tid in tids or (pid,):
+        (task / str(tid)).mkdir()
+        (task / str(tid) / 'stat').write_text(_stat_line(tid, comm, **kwargs))
+    return directory
+
+
+def test_stat_comm_with_spaces_and_parenthesis(tmp_path):
+    path = tmp_path / 'stat'
+    path.write_text(_stat_line(42, 'a b) (c', ppid=7))
+    stat = procfs._stat(str(path))
+    assert stat[:4] == [b'42', b'a b) (c', b'S', b'7']
+
+
+def test_process_entries_fields(tmp_path):
+    _process(tmp_path, 10, 'bash', ppid=3, priority=25, nice=5, threads=4, starttime=777)
+    backend = ProcfsBackend(str(tmp_path))
+    assert list(backend.process_entries()) == [(b'bash', 10, 3, 25, 4)]
+    assert backend.priority_class(10) == 5
+    assert backend.start_time(10) == 777
+
+
+def test_process_entries_skip_zombies(tmp_path):
+    _process(tmp_path, 10, 'alive')
+    _process(tmp_path, 11, 'zombie', state='Z')
+    (tmp_path / 'self').mkdir()
+    backend = ProcfsBackend(str(tmp_path))
+    assert [entry[1] for entry in backend.process_entries()] == [10]
+
+
+def test_processes_vanishing_while_listed(tmp_path):
+    _process(tmp_path, 10, 'alive', tids=(10, 12))
+    (tmp_path / '11').mkdir()  # exited between listing /proc and reading its stat
+    (tmp_path / '10' / 'task' / '13').mkdir()  # same for a thread
+    backend = ProcfsBackend(str(tmp_path))
+    assert [entry[1] for entry in backend.process_entries()] == [10]
+    assert [thread['tid'] for thread in backend.threads()] == [10, 12]
+
+    errors = []
+    assert backend.priority_class(11, errors) is None
+    assert backend.start_time(11, errors) is None
+    assert backend.modules(11, errors) == []
+    assert [error.pid for error in errors] == [11, 11, 11]
+
+
+def test_modules_merge_mappings_and_skip_anonymous(tmp_path):
+    maps = '\n'.join([
+        '00400000-00452000 r-xp 00000000 08:02 173521 /usr/bin/dbus-daemon',
+        '00651000-00652000 r--p 00051000 08:02 173521 /usr/bin/dbus-daemon',
+        '00652000-00655000 rw-p 00052000 08:02 173521 /usr/bin/dbus-daemon',
+        '00e03000-00e24000 rw-p 00000000 00:00 0 [heap]',
+        '7f0000000000-7f0000001000 rw-p 00000000 00:00 0',
+        '7f2c5e000000-7f2c5e1c0000 r-xp 00000000 08:02 135522 /lib/libc-2.19.so',
+        '7fff6b9c5000-7fff6b9e6000 rw-p 00000000 00:00 0 [stack]',
+    ]) + '\n'
+    _process(tmp_path, 10, 'dbus-daemon', maps=maps)
+    modules = ProcfsBackend(str(tmp_path)).modules(10)
+    assert [(m['name'], m['base_address'], m['base_size']) for m in modules] == [
+        (b'dbus-daemon', 0x400000, 0x655000 - 0x400000),
+        (b'libc-2.19.so', 0x7f2c5e000000, 0x1c0000),
+    ]
+    assert modules[0]['path'] == b'/usr/bin/dbus-daemon'
+    assert modules[0]['pid'] == 10
+
+
+def test_threads_read_task_directory(tmp_path):
+    _process(tmp_path, 10, 'a', tids=(10, 15), priority=21)
+    _process(tmp_path, 20, 'b', tids=(20,), priority=30)
+    backend = ProcfsBackend(str(tmp_path))
+    assert [(t['tid'], t['pid'], t['base_priority']) for t in backend.threads()] == [
+        (10, 10, 21), (15, 10, 21), (20, 20, 30)]
+    assert [t['tid'] for t in backend.threads(20)] == [20]
@@ -0,0 +1,79 @@
+from pyauto import process
+from pyauto.procwatch import ProcessWatcher
+
+
+def _entry(name, pid, ppid=1, threads=1):
+    return {'name': name, 'pid': pid, 'ppid': ppid, 'thread_count': threads, 'priority_base': 8}
+
+
+class FakeSnapshots(object):
+    def __init__(self):
+        self.entries = []
+
+    def __call__(self):
+        return [dict(entry) for entry in self.entries]
+
+
+def _events(events):
+    return sorted((event.kind, event.process['pid']) for event in events)
+
+
+def test_first_poll_reports_every_process_as_started():
+    snapshots = FakeSnapshots()
+    snapshots.entries = [_entry('a.exe', 10), _entry('b.exe', 11)]
+    watcher = ProcessWatcher(snapshots, identity=lambda p: p['name'])
+    assert _events(watcher.poll()) == [('started', 10), ('started', 11)]
+    assert watcher.poll() == []
+
+
+def test_exit_start_and_change():
+    snapshots = FakeSnapshots()
+    snapshots.entries = [_entry('a.exe', 10), _entry('b.exe', 11)]
+    watcher = ProcessWatcher(snapshots, identity=lambda p: p['name'])
+    watcher.poll()
+    snapshots.entries = [_entry('b.exe', 11, threads=4), _entry('c.exe', 12)]
+    events = watcher.poll()
+    assert [event.kind for event in events] == ['exited', 'started', 'changed']
+    assert _events(events) == [('changed', 11), ('exited', 10), ('started', 12)]
+    assert events[2].previous['thread_count'] == 1
+
+
+def test_modules_looked_up_once_per_process():
+    snapshots = FakeSnapshots()
+    snapshots.entries = [_entry('a.exe', 10)]
+    lookups = []
+    watcher = ProcessWatcher(snapshots, identity=lambda p: p['name'], modules=lambda pid: lookups.append(pid) or [])
+    watcher.poll()
+    watcher.poll()
+    assert lookups == [10]
+    assert watcher.processes[10, 'a.exe']['modules'] == []
+
+
+def test_default_identity_tells_reused_pid_apart():
+    backend = process.ListBackend([('worker.exe', 20, 1)])
+    process.set_backend(backend)
+    try:
+        watcher = ProcessWatcher(lambda: [_entry(*entry[:3]) for entry in backend.entries])
+        watcher.poll()
+        # The supervisor restarts a crashed worker, which gets the same pid, name and parent
+        backend.exit(20)
+        backend.start('worker.exe', 20, 1)
+        assert _events(watcher.poll()) == [('exited', 20), ('started', 20)]
+        assert watcher.poll() == []
+    finally:
+        process.set_backend(None)
+
+
+def test_default_identity_falls_back_to_name_and_ppid():
+    backend = process.ListBackend()
+    process.set_backend(backend)
+    try:
+        # Not in the backend, so its start time cannot be read
+        snapshots = FakeSnapshots()
+        snapshots.entries = [_entry('system', 4, 0)]
+        watcher = ProcessWatcher(snapshots)
+        watcher.poll()
+        assert list(watcher.processes) == [(4, ('system', 0))]
+        assert watcher.poll() == []
+    finally:
+        process.set_backend(None)
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import re
+
+from pyauto.window import Window, WindowSnapshot
+
+
+def _window(hwnd, title, class_name=u'Notepad', pid=10, visible=True):
+    return Window(hwnd, title, class_name, pid, (0, 0, 100, 100), visible)
+
+
+WINDOWS = [
+    _window(1, u'Untitled - Notepad'),
+    _window(2, u'', u'Shell_TrayWnd', 11),
+    _window(3, u'notes.txt - Notepad', pid=12, visible=False),
+    _window(4, u'Untitled - Paint', u'MSPaintApp', 13),
+    _window(5, u'Untitled - Notepad'),
+]
+
+
+def _hwnds(windows):
+    return [w.hwnd for w in windows]
+
+
+def test_exact_lookups():
+    snapshot = WindowSnapshot(WINDOWS)
+    assert len(snapshot) == 5
+    assert _hwnds(snapshot.with_title(u'Untitled - Notepad')) == [1, 5]
+    assert _hwnds(snapshot.with_class(u'Notepad', visible=False)) == [3]
+    assert _hwnds(snapshot.with_pid(10)) == [1, 5]
+    assert snapshot.with_title(u'Untitled') == []
+
+
+def test_title_starts_with():
+    snapshot = WindowSnapshot(WINDOWS)
+    assert _hwnds(snapshot.title_starts_with(u'Untitled')) == [1, 4, 5]
+    assert _hwnds(snapshot.title_starts_with(u'')) == [1, 2, 3, 4, 5]
+    assert snapshot.title_starts_with(u'zz') == []
+
+
+def test_title_contains():
+    snapshot = WindowSnapshot(WINDOWS)
+    assert _hwnds(snapshot.title_contains(u'Notepad')) == [1, 3, 5]
+    assert _hwnds(snapshot.title_contains(u'd - N')) == [1, 5]
+    assert _hwnds(snapshot.title_contains(u'NOTE', case_sensitive=False)) == [1, 3, 5]
+    assert _hwnds(snapshot.title_contains(u'NOTE', case_sensitive=False, visible=True)) == [1, 5]
+    assert _hwnds(snapshot.title_contains(u'')) == [1, 2, 3, 4, 5]
+
+
+def test_title_contains_ignoring_case_when_lowering_changes_lengths():
+    # u'İ'.lower() has two characters
+    snapshot = WindowSnapshot([_window(1, u'İİİİ'), _window(2, u'ab'), _window(3, u'cd')])
+    assert _hwnds(snapshot.title_contains(u'AB', case_sensitive=False)) == [2]
+    assert _hwnds(snapshot.title_contains(u'cd', case_sensitive=False)) == [3]
+
+
+def test_empty_snapshot():
+    snapshot = WindowSnapshot([])
+    assert snapshot.title_contains(u'') == []
+    assert snapshot.title_contains(u'x', case_sensitive=False) == []
+    assert snapshot.title_starts_with(u'') == []
+    assert snapshot.title_matches(u'.*') == []
+
+
+def test_title_matches():
+    snapshot = WindowSnapshot(WINDOWS)
+    assert _hwnds(snapshot.title_matches(u'^Untitled - (Paint|Notepad)$')) == [1, 4, 5]
+    assert _hwnds(snapshot.title_matches(re.compile(u'txt'))) == [3]